@@ -1,16 +1,35 @@
+from typing import TYPE_CHECKING, Any
+
 import stactools.core
 from stactools.cli import Registry
 
-from stactools.nrcan_landcover.cog import create_cog
-from stactools.nrcan_landcover.stac import create_collection, create_item
+if TYPE_CHECKING:
+    from stactools.nrcan_landcover.cog import create_cog
+    from stactools.nrcan_landcover.stac import (
+        create_collection,
+        create_item,
+        create_items,
+    )
 
-__all__ = [
-    create_collection.__name__, create_item.__name__, create_cog.__name__
-]
+__all__ = ["create_collection", "create_item", "create_items", "create_cog"]
 
 stactools.core.use_fsspec()
 
 
+def __getattr__(name: str) -> Any:
+    # The public functions are imported on first access so that registering
+    # the plugin (and every `stac` invocation) does not import the cog, stac
+    # and utils modules, nor the pystac extensions only they use. rasterio
+    # is already imported by stactools.core.
+    if name == "create_cog":
+        from stactools.nrcan_landcover.cog import create_cog
+        return create_cog
+    if name in ("create_collection", "create_item", "create_items"):
+        from stactools.nrcan_landcover import stac
+        return getattr(stac, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def register_plugin(registry: Registry) -> None:
     from stactools.nrcan_landcover import commands
     registry.register_subcommand(commands.create_nrcanlandcover_command)
@@ -1,24 +1,66 @@
 import logging
 import os
-from glob import glob
-from shutil import copyfile
-from subprocess import CalledProcessError, check_output
+import queue
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 from tempfile import TemporaryDirectory
-from zipfile import ZipFile
+from threading import Thread
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree as ET
+from zipfile import ZIP_DEFLATED, ZipFile
 
+import fsspec
 import rasterio
-import requests
+import rasterio.env
+import rasterio.shutil
+from rasterio.io import MemoryFile
+from rasterio.windows import Window
 
 from stactools.nrcan_landcover.constants import (
     COLOUR_MAP,
     JSONLD_HREF,
     NO_DATA_VALUE,
     TILING_PIXEL_SIZE,
+    VSICURL_CONFIG,
 )
-from stactools.nrcan_landcover.utils import get_metadata
+from stactools.nrcan_landcover.utils import download_cached, get_metadata
 
 logger = logging.getLogger(__name__)
 
+# Defaults for GDAL configuration options used when creating COGs.
+# rasterio takes the block cache size in bytes.
+GDAL_CONFIG: Dict[str, Any] = {
+    "GDAL_CACHEMAX": 3000 * 1024 * 1024,
+    "GDAL_NUM_THREADS": "ALL_CPUS"
+}
+
+# COG driver creation options shared by every COG, the compression method,
+# level, number of threads and block size are given per call
+COG_CREATION_OPTIONS: Dict[str, Any] = {
+    "driver": "COG",
+    "predictor": "YES",
+    "overviews": "IGNORE_EXISTING",
+    # Blocks that are entirely nodata are not written.
+    "sparse_ok": "YES",
+    "bigtiff": "IF_SAFER",
+}
+
+# VRT colour table entries, built once and shared by every COG.
+# Matches rasterio's write_colormap: 256 entries, unset ones opaque black.
+_COLOUR_TABLE_ENTRIES = tuple({
+    f"c{component}": str(value)
+    for component, value in enumerate(COLOUR_MAP.get(i, (0, 0, 0, 255)), 1)
+} for i in range(256))
+
+# Fixed-size part of a zip local file header
+_ZIP_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_ZIP_DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+# Upper bound on the data inflated at once, land cover compresses very well
+_INFLATE_BUFFER_SIZE = 16 * 1024 * 1024
+
 
 def download_create_cog(
     output_directory: str,
@@ -26,38 +68,203 @@ def download_create_cog(
     metadata_url: str = JSONLD_HREF,
     raise_on_fail: bool = True,
     dry_run: bool = False,
-) -> str:
+    stream: bool = False,
+    compress: str = "ZSTD",
+    num_threads: str = "ALL_CPUS",
+    block_size: int = 512,
+) -> List[str]:
+    """Downloads the NRCan Land Cover TIFF and creates COGs from it.
+
+    Returns:
+        List[str]: The paths to the COGs that were written.
+    """
     if dry_run:
         logger.info("Would have downloaded TIFF, created COG, and written COG")
-        return output_directory
+        return []
 
     metadata = get_metadata(metadata_url)
     access_url = metadata["tiff_metadata"]["dcat:accessURL"].get("@id")
-    with TemporaryDirectory() as tmp_dir:
-        # Extract filename from url
-        tmp_file = os.path.join(tmp_dir, access_url.split('/').pop())
+    is_remote = access_url.startswith(("http://", "https://"))
+    if stream and is_remote:
+        # Read the remote TIFF with HTTP range requests instead of
+        # downloading all of it first. A zipped TIFF is read from within the
+        # archive, so nothing but the COG is written to disk.
+        logger.info("Streaming TIFF")
+        logger.debug(f"access_url: {access_url}")
+        input_path = f"/vsicurl/{access_url}"
+        if access_url.endswith(".zip"):
+            input_path = (f"/vsizip/{input_path}/"
+                          f"{_remote_tif_member(access_url)}")
+        with rasterio.Env(**VSICURL_CONFIG):
+            return _create_cogs(input_path, output_directory, retile,
+                                raise_on_fail, dry_run, compress, num_threads,
+                                block_size)
 
+    with TemporaryDirectory() as tmp_dir:
         logger.info("Downloading TIFF")
         logger.debug(f"access_url: {access_url}")
-        resp = requests.get(access_url)
-
-        with open(tmp_file, 'wb') as f:
-            logger.info("Writing TIFF")
-            logger.debug(f"tmp_file: {tmp_file}")
-            f.write(resp.content)
         if access_url.endswith(".zip"):
-            logger.info("Unzipping TIFF")
-            with ZipFile(tmp_file, 'r') as zip_ref:
-                zip_ref.extractall(tmp_dir)
-        file_name = glob(f"{tmp_dir}/*.tif").pop()
-        if retile:
-            return create_retiled_cogs(file_name, output_directory,
-                                       raise_on_fail, dry_run)
+            file_name = _download_extract_tif(access_url, tmp_dir)
         else:
-            output_file = os.path.join(
-                output_directory,
-                os.path.basename(file_name).replace(".tif", "") + "_cog.tif")
-            return create_cog(file_name, output_file, raise_on_fail, dry_run)
+            # Re-uses an earlier download if the remote file is unchanged
+            file_name = download_cached(access_url)
+        return _create_cogs(file_name, output_directory, retile, raise_on_fail,
+                            dry_run, compress, num_threads, block_size)
+
+
+def _download_extract_tif(access_url: str, output_directory: str) -> str:
+    """Downloads a zipped TIFF and extracts it to the output directory.
+
+    When the TIFF is the first member of the archive it is inflated while
+    the archive is still downloading, otherwise it is extracted once the
+    download completes.
+    """
+    chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=16)
+    extracted: List[str] = []
+
+    def inflate() -> None:
+        stream = iter(chunks.get, None)
+        try:
+            extracted.append(_inflate_first_member(stream, output_directory))
+        except Exception as e:
+            logger.debug(f"Not extracting TIFF during download: {e}")
+        # Keep consuming, so that the download never blocks on a full queue
+        for _ in stream:
+            pass
+
+    thread = Thread(target=inflate, daemon=True)
+    thread.start()
+    try:
+        # Re-uses an earlier download if the remote file is unchanged, in
+        # which case no chunks are produced
+        zip_path = download_cached(access_url, on_chunk=chunks.put)
+    finally:
+        chunks.put(None)
+        thread.join()
+    if extracted:
+        return extracted[0]
+
+    logger.info("Unzipping TIFF")
+    with ZipFile(zip_path, 'r') as zip_ref:
+        # Only the TIFF is needed, skip decompressing anything else
+        return zip_ref.extract(_tif_member(zip_ref), output_directory)
+
+
+def _tif_member(zip_ref: ZipFile) -> str:
+    return next(n for n in zip_ref.namelist() if n.endswith(".tif"))
+
+
+def _remote_tif_member(access_url: str) -> str:
+    """Finds the TIFF in a remote zip archive, reading only the archive's
+    central directory with range requests."""
+    with fsspec.open(access_url) as f, ZipFile(f, 'r') as zip_ref:
+        return _tif_member(zip_ref)
+
+
+def _read_at_least(chunks: Iterator[bytes], buffer: bytes, size: int) -> bytes:
+    while len(buffer) < size:
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError("Unexpected end of zip archive")
+        buffer += chunk
+    return buffer
+
+
+def _inflate_first_member(chunks: Iterator[bytes],
+                          output_directory: str) -> str:
+    """Inflates the first member of a zip archive, given as a stream of its
+    bytes, to the output directory.
+
+    Only a deflated TIFF member is supported, anything else raises a
+    ValueError.
+    """
+    buffer = _read_at_least(chunks, b"", _ZIP_LOCAL_HEADER.size)
+    (signature, _, flags, method, _, _, crc, _, _, name_length,
+     extra_length) = _ZIP_LOCAL_HEADER.unpack_from(buffer)
+    # Bit 0 flags encryption
+    if (signature != _ZIP_LOCAL_HEADER_SIGNATURE or flags & 0x1
+            or method != ZIP_DEFLATED):
+        raise ValueError("Unsupported zip member")
+    data_offset = _ZIP_LOCAL_HEADER.size + name_length + extra_length
+    buffer = _read_at_least(chunks, buffer, data_offset)
+    # Bit 11 flags a UTF-8 file name
+    name = buffer[_ZIP_LOCAL_HEADER.size:_ZIP_LOCAL_HEADER.size +
+                  name_length].decode("utf-8" if flags & 0x800 else "cp437")
+    if not name.endswith(".tif"):
+        raise ValueError(f"First zip member is not a TIFF: {name}")
+
+    output_path = os.path.join(output_directory, os.path.basename(name))
+    logger.info("Unzipping TIFF while downloading")
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+    checksum = 0
+    with open(output_path, "wb") as f:
+        for chunk in chain([buffer[data_offset:]], chunks):
+            while chunk and not inflater.eof:
+                data = inflater.decompress(chunk, _INFLATE_BUFFER_SIZE)
+                chunk = inflater.unconsumed_tail
+                checksum = zlib.crc32(data, checksum)
+                f.write(data)
+            if inflater.eof:
+                break
+        data = inflater.flush()
+        checksum = zlib.crc32(data, checksum)
+        f.write(data)
+    if not inflater.eof:
+        raise ValueError("Unexpected end of zip archive")
+    # Bit 3 flags that the CRC is in a data descriptor following the data,
+    # rather than in the header. The descriptor may start with a signature.
+    if flags & 0x8:
+        descriptor = _read_at_least(chunks, inflater.unused_data, 8)
+        offset = 4 if descriptor.startswith(
+            _ZIP_DATA_DESCRIPTOR_SIGNATURE) else 0
+        (crc, ) = struct.unpack_from("<I", descriptor, offset)
+    if checksum != crc:
+        raise ValueError(f"CRC mismatch for {name}")
+    return output_path
+
+
+def _create_cogs(
+    input_path: str,
+    output_directory: str,
+    retile: bool,
+    raise_on_fail: bool,
+    dry_run: bool,
+    compress: str,
+    num_threads: str,
+    block_size: int,
+) -> List[str]:
+    if retile:
+        return create_retiled_cogs(input_path,
+                                   output_directory,
+                                   raise_on_fail,
+                                   dry_run,
+                                   compress=compress,
+                                   num_threads=num_threads,
+                                   block_size=block_size)
+    else:
+        output_file = os.path.join(
+            output_directory,
+            os.path.basename(input_path).replace(".tif", "") + "_cog.tif")
+        cog_file = _try_create_cog(input_path,
+                                   output_file,
+                                   raise_on_fail,
+                                   dry_run=dry_run,
+                                   compress=compress,
+                                   num_threads=num_threads,
+                                   block_size=block_size)
+        return [] if cog_file is None else [cog_file]
+
+
+def _try_create_cog(input_path: str, output_path: str, raise_on_fail: bool,
+                    **kwargs: Any) -> Optional[str]:
+    """Like create_cog, but returns None rather than the output path when
+    creating the COG fails and raise_on_fail is False."""
+    try:
+        return create_cog(input_path, output_path, **kwargs)
+    except Exception:
+        if raise_on_fail:
+            raise
+        return None
 
 
 def create_retiled_cogs(
@@ -65,7 +272,10 @@ def create_retiled_cogs(
     output_directory: str,
     raise_on_fail: bool = True,
     dry_run: bool = False,
-) -> str:
+    compress: str = "ZSTD",
+    num_threads: str = "ALL_CPUS",
+    block_size: int = 512,
+) -> List[str]:
     """Split tiff into tiles and create COGs
 
     Args:
@@ -75,11 +285,19 @@ def create_retiled_cogs(
             Defaults to True.
         dry_run (bool, optional): Run without downloading tif, creating COG,
             and writing COG. Defaults to False.
+        compress (str, optional): Compression method of the COGs.
+            Defaults to ZSTD.
+        num_threads (str, optional): Number of threads used to compress each
+            COG. The tiles are converted in one process per CPU, so ALL_CPUS
+            means a single thread per COG. Defaults to ALL_CPUS.
+        block_size (int, optional): Width and height of the internal blocks
+            of the COGs, the tiles are aligned to. Defaults to 512.
 
     Returns:
-        str: The path to the output COGs.
+        List[str]: The paths to the output COGs. Empty tiles are skipped, so
+            have no COG, as are tiles that failed when raise_on_fail is False.
     """
-    output = None
+    cog_files: List[str] = []
     try:
         if dry_run:
             logger.info(
@@ -89,38 +307,41 @@ def create_retiled_cogs(
             logger.info("Retiling TIFF")
             logger.debug(f"input_path: {input_path}")
             logger.debug(f"output_directory: {output_directory}")
-            with TemporaryDirectory() as tmp_dir:
-                cmd = [
-                    "gdal_retile.py",
-                    "-ps",
-                    str(TILING_PIXEL_SIZE[0]),
-                    str(TILING_PIXEL_SIZE[1]),
-                    "-targetDir",
-                    tmp_dir,
-                    input_path,
+            # Each tile is read from the input and written as a COG in one
+            # pass, without writing intermediate tiles to disk.
+            windows, output_files = _tile_windows(input_path, output_directory,
+                                                  block_size)
+            # Forward the active GDAL configuration, e.g. for /vsicurl/
+            gdal_config = rasterio.env.getenv() if rasterio.env.hasenv(
+            ) else {}
+            # Tiles are independent, so they are converted in parallel.
+            # Processes rather than threads are used, as GDAL dataset
+            # handles are not safe to share between threads.
+            workers = os.cpu_count() or 1
+            # The processes already use every CPU, so each compresses with a
+            # single thread, and they share the block cache between them.
+            if num_threads == "ALL_CPUS":
+                num_threads = "1"
+            cache_max = None
+            if "GDAL_CACHEMAX" not in os.environ:
+                cache_max = GDAL_CONFIG["GDAL_CACHEMAX"] // workers
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                cog_files = [
+                    output_file
+                    for output_file in ex.map(_process_tile,
+                                              repeat(input_path),
+                                              windows,
+                                              output_files,
+                                              repeat(raise_on_fail),
+                                              repeat(dry_run),
+                                              repeat(gdal_config),
+                                              repeat(compress),
+                                              repeat(num_threads),
+                                              repeat(block_size),
+                                              repeat(cache_max),
+                                              chunksize=4)
+                    if output_file is not None
                 ]
-                try:
-                    output = check_output(cmd)
-                except CalledProcessError as e:
-                    output = e.output
-                    raise
-                finally:
-                    logger.info(f"output: {str(output)}")
-                file_names = glob(f"{tmp_dir}/*.tif")
-                for f in file_names:
-                    input_file = os.path.join(tmp_dir, f)
-                    output_file = os.path.join(
-                        output_directory,
-                        os.path.basename(f).replace(".tif", "") + "_cog.tif")
-                    with rasterio.open(input_file, "r") as dataset:
-                        contains_data = dataset.read().any()
-                    # Exclude empty files
-                    if contains_data:
-                        logger.debug(f"Tile contains data: {input_file}")
-                        create_cog(input_file, output_file, raise_on_fail,
-                                   dry_run)
-                    else:
-                        logger.debug(f"Ignoring empty tile: {input_file}")
 
     except Exception:
         logger.error("Failed to process {}".format(input_path))
@@ -128,7 +349,186 @@ def create_retiled_cogs(
         if raise_on_fail:
             raise
 
-    return output_directory
+    return cog_files
+
+
+def _tile_windows(input_path: str, output_directory: str,
+                  block_size: int) -> Tuple[List[Window], List[str]]:
+    """Splits the input into windows of at least TILING_PIXEL_SIZE, rounded
+    up to whole blocks.
+
+    Tiles are named like gdal_retile.py names them, i.e.
+    `<name>_<row>_<col>_cog.tif` with 1-based indices, both zero-padded to
+    the number of digits of the larger tile count.
+    """
+    with rasterio.open(input_path) as dataset:
+        width, height = dataset.width, dataset.height
+    # Tiles start on block boundaries, so that the blocks of every tile line
+    # up with the blocks of its neighbours
+    tile_width, tile_height = (-(-size // block_size) * block_size
+                               for size in TILING_PIXEL_SIZE)
+    cols = range(0, width, tile_width)
+    rows = range(0, height, tile_height)
+    digits = len(str(max(len(cols), len(rows))))
+    name = os.path.basename(input_path).replace(".tif", "")
+    windows = []
+    output_files = []
+    for row_index, row in enumerate(rows, 1):
+        for col_index, col in enumerate(cols, 1):
+            windows.append(
+                Window(col, row, min(tile_width, width - col),
+                       min(tile_height, height - row)))
+            output_files.append(
+                os.path.join(
+                    output_directory, f"{name}_{row_index:0{digits}d}_"
+                    f"{col_index:0{digits}d}_cog.tif"))
+    return windows, output_files
+
+
+def _contains_data(input_path: str, window: Optional[Window] = None) -> bool:
+    """Whether any pixel of the first band, within the window, is non-zero.
+
+    Reads one block at a time and stops at the first block holding data,
+    so peak memory is a single block rather than the whole tile.
+    """
+    with rasterio.open(input_path, "r") as dataset:
+        if window is None:
+            window = Window(0, 0, dataset.width, dataset.height)
+        block_height, block_width = dataset.block_shapes[0]
+        # Start from the first block overlapping the window
+        row_start = window.row_off // block_height * block_height
+        col_start = window.col_off // block_width * block_width
+        for row in range(row_start, window.row_off + window.height,
+                         block_height):
+            for col in range(col_start, window.col_off + window.width,
+                             block_width):
+                block = Window(col, row, block_width,
+                               block_height).intersection(window)
+                if dataset.read(1, window=block).any():
+                    return True
+    return False
+
+
+def _process_tile(
+    input_path: str,
+    window: Window,
+    output_file: str,
+    raise_on_fail: bool,
+    dry_run: bool,
+    gdal_config: Dict[str, Any],
+    compress: str,
+    num_threads: str,
+    block_size: int,
+    cache_max: Optional[int],
+) -> Optional[str]:
+    with rasterio.Env(**gdal_config):
+        # Exclude empty tiles
+        if _contains_data(input_path, window):
+            logger.debug(f"Tile contains data: {output_file}")
+            return _try_create_cog(input_path,
+                                   output_file,
+                                   raise_on_fail,
+                                   dry_run=dry_run,
+                                   compress=compress,
+                                   window=window,
+                                   num_threads=num_threads,
+                                   block_size=block_size,
+                                   cache_max=cache_max)
+        else:
+            logger.debug(f"Ignoring empty tile: {output_file}")
+            return None
+
+
+def _colormap_vrt(input_path: str, window: Optional[Window] = None) -> str:
+    """Builds a VRT of the first band of the input, or of a window of it,
+    with the land cover colour map and nodata value attached."""
+    with rasterio.open(input_path) as dataset:
+        if window is None:
+            width, height = dataset.width, dataset.height
+            transform = dataset.transform
+        else:
+            width, height = window.width, window.height
+            transform = dataset.window_transform(window)
+        vrt = ET.Element("VRTDataset",
+                         rasterXSize=str(width),
+                         rasterYSize=str(height))
+        if dataset.crs is not None:
+            ET.SubElement(vrt, "SRS").text = dataset.crs.to_wkt()
+        ET.SubElement(vrt, "GeoTransform").text = ", ".join(
+            repr(v) for v in transform.to_gdal())
+    # Land cover classes are always stored as bytes
+    band = ET.SubElement(vrt, "VRTRasterBand", dataType="Byte", band="1")
+    ET.SubElement(band, "NoDataValue").text = str(NO_DATA_VALUE)
+    ET.SubElement(band, "ColorInterp").text = "Palette"
+    colour_table = ET.SubElement(band, "ColorTable")
+    for entry in _COLOUR_TABLE_ENTRIES:
+        ET.SubElement(colour_table, "Entry", entry)
+    source = ET.SubElement(band, "SimpleSource")
+    ET.SubElement(source, "SourceFilename",
+                  relativeToVRT="0").text = input_path
+    ET.SubElement(source, "SourceBand").text = "1"
+    if window is not None:
+        ET.SubElement(source,
+                      "SrcRect",
+                      xOff=str(window.col_off),
+                      yOff=str(window.row_off),
+                      xSize=str(width),
+                      ySize=str(height))
+        ET.SubElement(source,
+                      "DstRect",
+                      xOff="0",
+                      yOff="0",
+                      xSize=str(width),
+                      ySize=str(height))
+    return ET.tostring(vrt, encoding="unicode")
+
+
+def _is_landcover_cog(input_path: str, compress: str, block_size: int) -> bool:
+    """Whether the input is a COG using the given compression and block size
+    and the horizontal predictor, with the land cover colour map and nodata
+    value already applied."""
+    with rasterio.open(input_path) as dataset:
+        image_structure = dataset.tags(ns="IMAGE_STRUCTURE")
+        if (image_structure.get("LAYOUT") != "COG"
+                or image_structure.get("COMPRESSION") != compress.upper()
+                or image_structure.get("PREDICTOR") != "2"
+                or dataset.block_shapes[0] != (block_size, block_size)
+                or dataset.nodata != NO_DATA_VALUE):
+            return False
+        try:
+            colormap = dataset.colormap(1)
+        except ValueError:
+            return False
+    # GeoTIFF colour tables do not store alpha, so only compare RGB
+    return all(colormap[i][:3] == COLOUR_MAP.get(i, (0, 0, 0))[:3]
+               for i in range(256))
+
+
+def _copy_cog(input_path: str, output_path: str, link: bool = False) -> None:
+    """Copies the input to the output path, or hard links it if asked to and
+    the two are on the same filesystem.
+
+    A hard link shares its data with the input, so writing to the output in
+    place also changes the input.
+    """
+    if (os.path.exists(input_path) and os.path.exists(output_path)
+            and os.path.samefile(input_path, output_path)):
+        return
+    # Go through a temporary name, so that the output is replaced rather
+    # than truncated in place.
+    tmp_path = output_path + ".part"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    linked = False
+    if link:
+        try:
+            os.link(input_path, tmp_path)
+            linked = True
+        except OSError:
+            pass
+    if not linked:
+        rasterio.shutil.copyfiles(input_path, tmp_path)
+    os.replace(tmp_path, output_path)
 
 
 def create_cog(
@@ -136,6 +536,13 @@ def create_cog(
     output_path: str,
     raise_on_fail: bool = True,
     dry_run: bool = False,
+    compress: str = "ZSTD",
+    level: Optional[int] = None,
+    window: Optional[Window] = None,
+    num_threads: str = "ALL_CPUS",
+    block_size: int = 512,
+    cache_max: Optional[int] = None,
+    link: bool = False,
 ) -> str:
     """Create COG from a TIFF
 
@@ -146,64 +553,73 @@ def create_cog(
             Defaults to True.
         dry_run (bool, optional): Run without downloading TIFF, creating COG,
             and writing COG. Defaults to False.
+        compress (str, optional): Compression method of the COG.
+            Defaults to ZSTD.
+        level (int, optional): Compression level. Defaults to 9. An input
+            that already is a suitable COG is copied rather than re-encoded,
+            unless a level is given, as the level of a COG cannot be read
+            back from it.
+        window (Window, optional): Only convert this window of the input.
+            Defaults to the whole input.
+        num_threads (str, optional): Number of threads used to compress the
+            COG, or ALL_CPUS. Defaults to ALL_CPUS.
+        block_size (int, optional): Width and height of the internal blocks
+            of the COG. Defaults to 512.
+        cache_max (int, optional): Size of the GDAL block cache in bytes.
+            Defaults to GDAL_CACHEMAX, from the environment or GDAL_CONFIG.
+        link (bool, optional): Hard link, rather than copy, an input that
+            already is a suitable COG. The output then shares its data with
+            the input. Defaults to False.
 
     Returns:
         str: The path to the output COG.
     """
 
-    with TemporaryDirectory() as tmp_dir:
-        # The colormap must be applied before processing.
-        # This ensures that the correct defaults are used.
-        # e.g. NEAREST rather than CUBIC for calculating overviews.
-        # So we copy the input file to a temp dir and apply it before
-        # running gdal_translate.
-        tmp_path = os.path.join(tmp_dir, os.path.basename(input_path))
-        copyfile(input_path, tmp_path)
-        with rasterio.open(tmp_path, "r+") as dataset:
-            dataset.write_colormap(1, COLOUR_MAP)
-        output = None
-        try:
-            if dry_run:
-                logger.info(
-                    "Would have read TIFF, created COG, and written COG")
-            else:
-                logger.info("Converting TIFF to COG")
-                logger.debug(f"input_path: {input_path}")
-                logger.debug(f"output_path: {output_path}")
-                cmd = [
-                    "gdal_translate",
-                    "-of",
-                    "COG",
-                    "-co",
-                    "NUM_THREADS=ALL_CPUS",
-                    "-co",
-                    "BLOCKSIZE=512",
-                    "-co",
-                    "COMPRESS=DEFLATE",
-                    "-co",
-                    "LEVEL=9",
-                    "-co",
-                    "PREDICTOR=YES",
-                    "-co",
-                    "OVERVIEWS=IGNORE_EXISTING",
-                    "-a_nodata",
-                    str(NO_DATA_VALUE),
-                    tmp_path,
-                    output_path,
-                ]
-
-                try:
-                    output = check_output(cmd)
-                except CalledProcessError as e:
-                    output = e.output
-                    raise
-                finally:
-                    logger.info(f"output: {str(output)}")
+    try:
+        if dry_run:
+            logger.info("Would have read TIFF, created COG, and written COG")
+        elif (window is None and level is None
+              and _is_landcover_cog(input_path, compress, block_size)):
+            # Nothing to re-encode, the input already is the COG we want
+            logger.info("TIFF is already a COG, copying")
+            logger.debug(f"input_path: {input_path}")
+            logger.debug(f"output_path: {output_path}")
+            _copy_cog(input_path, output_path, link)
+        else:
+            logger.info("Converting TIFF to COG")
+            logger.debug(f"input_path: {input_path}")
+            logger.debug(f"output_path: {output_path}")
+            # The colormap must be applied before processing.
+            # This ensures that the correct defaults are used.
+            # e.g. NEAREST rather than CUBIC for calculating overviews.
+            # It is attached, with the nodata value, to an in-memory VRT
+            # wrapping the input, so the input is only read once and is
+            # never modified.
+            # Environment variables take precedence over these defaults.
+            gdal_config = {
+                k: v
+                for k, v in dict(GDAL_CONFIG,
+                                 GDAL_NUM_THREADS=num_threads).items()
+                if k not in os.environ
+            }
+            if cache_max is not None:
+                gdal_config["GDAL_CACHEMAX"] = cache_max
+            with MemoryFile(_colormap_vrt(input_path, window).encode(),
+                            ext=".vrt") as vrt, rasterio.Env(**gdal_config):
+                # GDAL CreateCopy with the COG driver, run in-process
+                # rather than shelling out to gdal_translate.
+                rasterio.shutil.copy(vrt.name,
+                                     output_path,
+                                     compress=compress,
+                                     level=9 if level is None else level,
+                                     num_threads=num_threads,
+                                     blocksize=block_size,
+                                     **COG_CREATION_OPTIONS)
 
-        except Exception:
-            logger.error("Failed to process {}".format(output_path))
+    except Exception:
+        logger.error("Failed to process {}".format(output_path))
 
-            if raise_on_fail:
-                raise
+        if raise_on_fail:
+            raise
 
     return output_path
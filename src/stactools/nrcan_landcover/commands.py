@@ -1,16 +1,86 @@
 import logging
 import os
-from glob import glob
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import click
 
-from stactools.nrcan_landcover import cog, extent, stac, utils
 from stactools.nrcan_landcover.constants import JSONLD_HREF
 
+if TYPE_CHECKING:
+    import pystac
+
 logger = logging.getLogger(__name__)
 
 
+def _default_extent_asset(destination: str,
+                          extent_asset: Optional[str]) -> Optional[str]:
+    if extent_asset is None and os.path.exists(
+            os.path.join(destination, "extent.geojson")):
+        extent_asset = os.path.join(destination, "extent.geojson")
+    return extent_asset
+
+
+def _save_item(destination: str, cog: str, item: "pystac.Item",
+               validate: bool) -> None:
+    output_path = os.path.join(destination,
+                               os.path.basename(cog)[:-4] + ".json")
+    item.set_self_href(output_path)
+    item.make_asset_hrefs_relative()
+    item.save_object()
+    if validate:
+        item.validate()
+
+
+def _create_item(destination: str,
+                 cog: str,
+                 extent_asset: Optional[str],
+                 jsonld_metadata: Dict[str, Any],
+                 metadata: str,
+                 validate: bool = True) -> "pystac.Item":
+    from stactools.nrcan_landcover import stac
+
+    item = stac.create_item(jsonld_metadata,
+                            destination,
+                            metadata,
+                            cog,
+                            extent_asset_href=_default_extent_asset(
+                                destination, extent_asset))
+    _save_item(destination, cog, item, validate)
+    return item
+
+
+def _create_items(destination: str, cogs: List[str],
+                  extent_assets: List[Optional[str]],
+                  jsonld_metadata: Dict[str, Any], metadata: str,
+                  validate: bool) -> None:
+    """Creates and saves the STAC Items of many COGs, in parallel with
+    stac.create_items."""
+    from stactools.nrcan_landcover import stac
+
+    items = stac.create_items(jsonld_metadata,
+                              destination,
+                              cogs,
+                              metadata,
+                              extent_asset_hrefs=extent_assets)
+    for cog, item in zip(cogs, items):
+        _save_item(destination, cog, item, validate)
+
+
+def _create_extent_asset(destination: str, jsonld_metadata: Dict[str, Any],
+                         cog: Optional[str]) -> str:
+    from stactools.nrcan_landcover import extent
+
+    if cog is not None:
+        file_name = os.path.basename(cog).replace(".tif", "_extent.geojson")
+    else:
+        file_name = "extent.geojson"
+    output_path = os.path.join(destination, file_name)
+    extent.create_extent_asset(jsonld_metadata, output_path, cog)
+    return output_path
+
+
 def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
     """Creates the nrcanlandcover command line utility."""
     @cli.group(
@@ -19,8 +89,23 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
             "Commands for working with Natural Resources Canada Land Cover data"
         ),
     )
-    def nrcanlandcover() -> None:
-        pass
+    @click.option(
+        "-m",
+        "--metadata",
+        help="The url to the metadata jsonld, for subcommands not given one",
+        default=JSONLD_HREF,
+    )
+    @click.pass_context
+    def nrcanlandcover(ctx: click.Context, metadata: str) -> None:
+        ctx.ensure_object(dict)["metadata"] = metadata
+
+    def metadata_or_default(metadata: Optional[str]) -> str:
+        # Subcommands fall back to the metadata given to the group, which is
+        # then parsed once however many subcommand functions use it.
+        if metadata is None:
+            group_metadata: str = click.get_current_context().obj["metadata"]
+            return group_metadata
+        return metadata
 
     @nrcanlandcover.command(
         "create-collection",
@@ -36,27 +121,38 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
         "-m",
         "--metadata",
         help="The url to the metadata jsonld",
-        default=JSONLD_HREF,
     )
-    def create_collection_command(destination: str, metadata: str) -> None:
+    @click.option(
+        "--validate/--no-validate",
+        help="Validate the STAC Collection.",
+        default=True,
+    )
+    def create_collection_command(destination: str, metadata: Optional[str],
+                                  validate: bool) -> None:
         """Creates a STAC Collection from NRCan Landcover metadata
 
         Args:
             destination (str): Directory used to store the collection json
             metadata (str): Path to a jsonld metadata file - provided by NRCan
+            validate (bool): Validate the STAC Collection
         Returns:
             Callable
         """
-        create_collection_command_fn(destination, metadata)
+        create_collection_command_fn(destination,
+                                     metadata_or_default(metadata), validate)
+
+    def create_collection_command_fn(destination: str,
+                                     metadata: str,
+                                     validate: bool = True) -> None:
+        from stactools.nrcan_landcover import stac, utils
 
-    def create_collection_command_fn(destination: str, metadata: str) -> None:
         metadata_dict = utils.get_metadata(metadata)
         output_path = os.path.join(destination, "collection.json")
         collection = stac.create_collection(metadata_dict, metadata)
         collection.set_self_href(output_path)
-        collection.normalize_hrefs(destination)
         collection.save()
-        collection.validate()
+        if validate:
+            collection.validate()
 
     @nrcanlandcover.command(
         "create-cog",
@@ -81,8 +177,38 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
         is_flag=True,
         default=False,
     )
-    def create_cog_command(destination: str, source: Optional[str],
-                           tile: bool) -> None:
+    @click.option(
+        "-m",
+        "--metadata",
+        help="The url to the metadata jsonld, used to download the GeoTiff",
+    )
+    @click.option(
+        "--stream",
+        help=("Read the GeoTiff with HTTP range requests instead of "
+              "downloading it, when no source is given."),
+        is_flag=True,
+        default=False,
+    )
+    @click.option(
+        "--compress",
+        help="Compression method of the COG, e.g. ZSTD, DEFLATE or LZW.",
+        default="ZSTD",
+    )
+    @click.option(
+        "--num-threads",
+        help="Number of threads used to compress the COG, or ALL_CPUS.",
+        default="ALL_CPUS",
+    )
+    @click.option(
+        "--block-size",
+        help="Width and height of the internal blocks of the COG.",
+        type=int,
+        default=512,
+    )
+    def create_cog_command(destination: str, source: Optional[str], tile: bool,
+                           metadata: Optional[str], stream: bool,
+                           compress: str, num_threads: str,
+                           block_size: int) -> None:
         """Generate a COG from a GeoTiff. The COG will be saved in the desination
         with `_cog.tif` appended to the name.
 
@@ -90,23 +216,58 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
             destination (str): Local directory to save output COGs
             source (str, optional): An input NRCAN Landcover GeoTiff
             tile (bool, optional): Tile the tiff into many smaller files
+            metadata (str, optional): url of the metadata used to download
+                the GeoTiff when no source is given
+            stream (bool, optional): Read the GeoTiff with HTTP range
+                requests instead of downloading it
+            compress (str, optional): Compression method of the COG
+            num_threads (str, optional): Number of threads used to compress
+                the COG
+            block_size (int, optional): Width and height of the internal
+                blocks of the COG
         """
-        create_cog_command_fn(destination, source, tile)
+        create_cog_command_fn(destination, source, tile,
+                              metadata_or_default(metadata), stream, compress,
+                              num_threads, block_size)
+
+    def create_cog_command_fn(destination: str,
+                              source: Optional[str],
+                              tile: bool,
+                              metadata: str = JSONLD_HREF,
+                              stream: bool = False,
+                              compress: str = "ZSTD",
+                              num_threads: str = "ALL_CPUS",
+                              block_size: int = 512) -> List[str]:
+        from stactools.nrcan_landcover import cog
 
-    def create_cog_command_fn(destination: str, source: Optional[str],
-                              tile: bool) -> None:
         if not os.path.isdir(destination):
             raise IOError(f'Destination folder "{destination}" not found')
 
         if source is None:
-            cog.download_create_cog(destination, retile=tile)
+            return cog.download_create_cog(destination,
+                                           retile=tile,
+                                           metadata_url=metadata,
+                                           stream=stream,
+                                           compress=compress,
+                                           num_threads=num_threads,
+                                           block_size=block_size)
         elif tile:
-            cog.create_retiled_cogs(source, destination)
+            return cog.create_retiled_cogs(source,
+                                           destination,
+                                           compress=compress,
+                                           num_threads=num_threads,
+                                           block_size=block_size)
         else:
             output_path = os.path.join(
                 destination,
                 os.path.basename(source)[:-4] + "_cog.tif")
-            cog.create_cog(source, output_path)
+            return [
+                cog.create_cog(source,
+                               output_path,
+                               compress=compress,
+                               num_threads=num_threads,
+                               block_size=block_size)
+            ]
 
     @nrcanlandcover.command(
         "create-item",
@@ -122,7 +283,7 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
         "-c",
         "--cog",
         required=True,
-        help="COG href",
+        help="COG href, or a directory of COGs to create an Item for each of",
     )
     @click.option(
         "-e",
@@ -134,39 +295,46 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
         "-m",
         "--metadata",
         help="The url to the metadata description.",
-        default=JSONLD_HREF,
+    )
+    @click.option(
+        "--validate/--no-validate",
+        help="Validate the STAC Item.",
+        default=True,
     )
     def create_item_command(destination: str, cog: str,
                             extent_asset: Optional[str],
-                            metadata: str) -> None:
+                            metadata: Optional[str], validate: bool) -> None:
         """Generate a STAC item using the metadata, with an asset url as provided.
 
         Args:
             destination (str): Local directory to save the STAC Item json
-            cog (str): location of a COG asset for the item
+            cog (str): location of a COG asset for the item, or a local
+                directory of COGs
             extent_asset (str, optional): File containing a GeoJSON asset of the extent
             metadata (str): url containing the NRCAN Landcover JSONLD metadata
+            validate (bool): Validate the STAC Item
         """
-        create_item_command_fn(destination, cog, extent_asset, metadata)
+        create_item_command_fn(destination, cog, extent_asset,
+                               metadata_or_default(metadata), validate)
 
-    def create_item_command_fn(destination: str, cog: str,
+    def create_item_command_fn(destination: str,
+                               cog: str,
                                extent_asset: Optional[str],
-                               metadata: str) -> None:
+                               metadata: str,
+                               validate: bool = True) -> None:
+        from stactools.nrcan_landcover import utils
+
         jsonld_metadata = utils.get_metadata(metadata)
-        output_path = os.path.join(destination,
-                                   os.path.basename(cog)[:-4] + ".json")
-        if extent_asset is None and os.path.exists(
-                os.path.join(destination, "extent.geojson")):
-            extent_asset = os.path.join(destination, "extent.geojson")
-        item = stac.create_item(jsonld_metadata,
-                                destination,
-                                metadata,
-                                cog,
-                                extent_asset_href=extent_asset)
-        item.set_self_href(output_path)
-        item.make_asset_hrefs_relative()
-        item.save_object()
-        item.validate()
+        if not os.path.isdir(cog):
+            _create_item(destination, cog, extent_asset, jsonld_metadata,
+                         metadata, validate)
+            return
+
+        cog_files = sorted(entry.path for entry in os.scandir(cog)
+                           if entry.is_file() and entry.name.endswith(".tif"))
+        extent_asset = _default_extent_asset(destination, extent_asset)
+        _create_items(destination, cog_files, [extent_asset] * len(cog_files),
+                      jsonld_metadata, metadata, validate)
 
     @nrcanlandcover.command(
         "create-extent-asset",
@@ -182,7 +350,6 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
         "-m",
         "--metadata",
         help="The url to the metadata description.",
-        default=JSONLD_HREF,
     )
     @click.option(
         "-c",
@@ -190,7 +357,7 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
         required=False,
         help="COG href",
     )
-    def create_extent_asset_command(destination: str, metadata: str,
+    def create_extent_asset_command(destination: str, metadata: Optional[str],
                                     cog: Optional[str]) -> None:
         """Generate a GeoJSON of the extent of the STAC Item.
 
@@ -198,21 +365,18 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
             destination (str): Local directory to save output COGs
             metadata (str): URL to the metadata
         """
-        create_extent_asset_command_fn(destination, metadata, cog)
+        create_extent_asset_command_fn(destination,
+                                       metadata_or_default(metadata), cog)
 
     def create_extent_asset_command_fn(destination: str, metadata: str,
                                        cog: Optional[str]) -> None:
+        from stactools.nrcan_landcover import utils
+
         if not os.path.isdir(destination):
             raise IOError(f'Destination folder "{destination}" not found')
 
         jsonld_metadata = utils.get_metadata(metadata)
-        if cog is not None:
-            file_name = os.path.basename(cog).replace(".tif",
-                                                      "_extent.geojson")
-        else:
-            file_name = "extent.geojson"
-        output_path = os.path.join(destination, file_name)
-        extent.create_extent_asset(jsonld_metadata, output_path, cog)
+        _create_extent_asset(destination, jsonld_metadata, cog)
 
     @nrcanlandcover.command(
         "build-full-collection",
@@ -235,7 +399,6 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
         "-m",
         "--metadata",
         help="The url to the metadata jsonld",
-        default=JSONLD_HREF,
     )
     @click.option(
         "-t",
@@ -244,8 +407,39 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
         is_flag=True,
         default=False,
     )
+    @click.option(
+        "--validate/--no-validate",
+        help="Validate the STAC Collection and Items.",
+        default=False,
+    )
+    @click.option(
+        "--stream",
+        help=("Read the GeoTiff with HTTP range requests instead of "
+              "downloading it, when no source is given."),
+        is_flag=True,
+        default=False,
+    )
+    @click.option(
+        "--compress",
+        help="Compression method of the COG, e.g. ZSTD, DEFLATE or LZW.",
+        default="ZSTD",
+    )
+    @click.option(
+        "--num-threads",
+        help="Number of threads used to compress the COG, or ALL_CPUS.",
+        default="ALL_CPUS",
+    )
+    @click.option(
+        "--block-size",
+        help="Width and height of the internal blocks of the COG.",
+        type=int,
+        default=512,
+    )
     def build_full_collection_command(destination: str, source: str,
-                                      metadata: str, tile: bool) -> None:
+                                      metadata: Optional[str], tile: bool,
+                                      validate: bool, stream: bool,
+                                      compress: str, num_threads: str,
+                                      block_size: int) -> None:
         """Creates a STAC collection with Items and Assets
 
         Args:
@@ -253,38 +447,56 @@ def create_nrcanlandcover_command(cli: click.Group) -> click.Command:
             source (str, optional): Path to a GeoTIF of the dataset
             metadata (str, optional): Path to a jsonld metadata file - provided by NRCan
             tile (bool, optional): Tile the tiff into many smaller files
+            validate (bool, optional): Validate the STAC Collection and Items
+            stream (bool, optional): Read the GeoTiff with HTTP range
+                requests instead of downloading it
+            compress (str, optional): Compression method of the COGs
+            num_threads (str, optional): Number of threads used to compress
+                each COG
+            block_size (int, optional): Width and height of the internal
+                blocks of the COGs
         Returns:
             Callable
         """
+        metadata = metadata_or_default(metadata)
         # Create the COG from a GeoTIFF.
-        # If a source TIFF is not provided, it will be downloaded to /tmp.
+        # If a source TIFF is not provided, it is downloaded to the cache
+        # in $XDG_CACHE_HOME/nrcan_landcover, or read with HTTP range
+        # requests and not written to disk with --stream.
         # Enabling tiling will result in many smaller COGs.
-        create_cog_command_fn(
+        cog_files = create_cog_command_fn(
             destination=destination,
             source=source,
             tile=tile,
+            metadata=metadata,
+            stream=stream,
+            compress=compress,
+            num_threads=num_threads,
+            block_size=block_size,
         )
-        # Create STAC Items for each COG.
-        for cog_file in glob(f"{destination}/*.tif"):
-            create_extent_asset_command_fn(
-                destination=destination,
-                cog=cog_file,
-                metadata=metadata,
-            )
-            extent_file = os.path.join(
-                destination,
-                os.path.basename(cog_file).replace(".tif", "_extent.geojson"),
-            )
-            create_item_command_fn(
+        # Create STAC Items for each COG written above, ignoring any other
+        # TIFFs already in the destination.
+        # The metadata is fetched once and shared by all of the COGs.
+        from stactools.nrcan_landcover import utils
+
+        jsonld_metadata = utils.get_metadata(metadata)
+        with ThreadPoolExecutor() as ex:
+            # Writing an extent asset mostly waits on reading its COG header
+            extent_assets: List[Optional[str]] = list(
+                ex.map(partial(_create_extent_asset, destination,
+                               jsonld_metadata), cog_files))
+            items = ex.submit(_create_items, destination, cog_files,
+                              extent_assets, jsonld_metadata, metadata,
+                              validate)
+            # Create a STAC Collection.
+            # It does not depend on the Items, so it is written while they
+            # are created.
+            create_collection_command_fn(
                 destination=destination,
-                cog=cog_file,
-                extent_asset=extent_file,
                 metadata=metadata,
+                validate=validate,
             )
-        # Create a STAC Collection.
-        create_collection_command_fn(
-            destination=destination,
-            metadata=metadata,
-        )
+            # Raise any error from the Items
+            items.result()
 
     return nrcanlandcover
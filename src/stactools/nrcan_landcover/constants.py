@@ -1,11 +1,13 @@
 # flake8: noqa
 
-from pyproj import CRS
+from typing import Any
+
 from pystac import Link, Provider, ProviderRole
 
 LANDCOVER_ID = "nrcan-landcover"
 LANDCOVER_EPSG = 3978
-LANDCOVER_CRS_WKT = CRS.from_epsg(LANDCOVER_EPSG).to_wkt()
+# Looked up in the PROJ database on first access, see __getattr__
+LANDCOVER_CRS_WKT: str
 LANDCOVER_TITLE = "Land Cover of Canada - Cartographic Product Collection"
 LICENSE = "OGL-Canada-2.0"
 LICENSE_LINK = Link(
@@ -31,6 +33,9 @@ NRCAN_PROVIDER = Provider(
 DOI = "10.4095/315659"  # https://doi.org/10.4095/315659
 CITATION = "Latifovic, R., 2019. Canada’s land cover; Natural Resources Canada, General Information Product 119e, version 2015, 1 poster."
 
+# Seconds a downloaded copy of the metadata is re-used for
+METADATA_CACHE_TTL = 60 * 60
+
 JSONLD_HREF = "https://open.canada.ca/data/en/dataset/4e615eae-b90c-420b-adee-2ca35896caf6.jsonld"
 
 NRCAN_FTP = "http://ftp.maps.canada.ca/pub/nrcan_rncan/Land-cover_Couverture-du-sol/canada-landcover_canada-couverture-du-sol/CanadaLandcover2015.zip"
@@ -93,4 +98,29 @@ NO_DATA_VALUE = 0
 
 TILING_PIXEL_SIZE = (10001, 10001)
 
+# GDAL configuration for reading a single remote TIFF, or zipped TIFF, with
+# HTTP range requests
+VSICURL_CONFIG = {
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.zip",
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+}
+
+# GDAL configuration for reading the header of a COG, which may be remote.
+# Sibling files are not listed, and remote reads are cached and merged.
+COG_READ_CONFIG = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif",
+    "VSI_CACHE": "TRUE",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+}
+
 FULL_DATASET_BBOX = [-2600030.0, -885090.0, 3100000.0, 3914940.0]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "LANDCOVER_CRS_WKT":
+        from pyproj import CRS
+        wkt = CRS.from_epsg(LANDCOVER_EPSG).to_wkt()
+        globals()[name] = wkt
+        return wkt
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,13 @@
-import json
 import logging
+import os
 from typing import Any, Dict, Optional
+from urllib.parse import urlparse
 
 from pystac.stac_io import DefaultStacIO
 from stactools.core.io import ReadHrefModifier
 
 from stactools.nrcan_landcover.stac import get_cog_geom
+from stactools.nrcan_landcover.utils import json_dumps, write_json
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +23,20 @@ def create_extent_asset(
         cog_geom = get_cog_geom(cog_href_modifier(cog_href), metadata)
     else:
         cog_geom = get_cog_geom(cog_href, metadata)
-    DefaultStacIO().write_text_to_href(
-        output_path,
-        json.dumps({
-            "type":
-            "FeatureCollection",
-            "features": [{
-                "type": "Feature",
-                "geometry": cog_geom['geometry'],
-                "properties": {}
-            }]
-        }))
+    feature_collection = {
+        "type":
+        "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "geometry": cog_geom['geometry'],
+            "properties": {}
+        }]
+    }
+    if urlparse(output_path).scheme:
+        DefaultStacIO().write_text_to_href(output_path,
+                                           json_dumps(feature_collection))
+    else:
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        write_json(feature_collection, output_path)
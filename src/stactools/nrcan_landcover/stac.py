@@ -1,14 +1,15 @@
 import logging
 import os
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-import fsspec
 import pystac
-import pytz
 import rasterio
-from dateutil.relativedelta import relativedelta
-from pyproj import CRS, Proj
+from fsspec.core import url_to_fs
+from pyproj import CRS, Proj, Transformer
 from pystac.extensions.file import FileExtension
 from pystac.extensions.item_assets import AssetDefinition, ItemAssetsExtension
 from pystac.extensions.label import (
@@ -25,13 +26,12 @@ from pystac.extensions.raster import (
     Sampling,
 )
 from pystac.extensions.scientific import ScientificExtension
-from shapely.geometry import Polygon, box
-from shapely.geometry import mapping as geojson_mapping
 from stactools.core.io import ReadHrefModifier
 
 from stactools.nrcan_landcover.constants import (
     CITATION,
     CLASSIFICATION_VALUES,
+    COG_READ_CONFIG,
     DESCRIPTION,
     DOI,
     FULL_DATASET_BBOX,
@@ -52,34 +52,220 @@ from stactools.nrcan_landcover.utils import uri_validator
 logger = logging.getLogger(__name__)
 
 
+class _MetadataFields(NamedTuple):
+    title: str
+    description: str
+    start_datetime: datetime
+    end_datetime: datetime
+    geometry: Dict[str, Any]
+    bbox: Tuple[float, float, float, float]
+
+
+# Derived from CLASSIFICATION_VALUES once, rather than on every call.
+_CLASSIFICATION_NAMES = tuple(CLASSIFICATION_VALUES.values())
+_CLASSIFICATIONS = tuple(CLASSIFICATION_VALUES.items())
+
+
+def _file_values() -> List[Dict[str, Any]]:
+    """The file:values mapping of every COG.
+
+    New dicts are created on each call, as callers may modify them through
+    the Item or Collection they end up in.
+    """
+    return [{
+        "values": [value],
+        "summary": summary
+    } for value, summary in _CLASSIFICATIONS]
+
+
+def _cog_raster_band() -> RasterBand:
+    """The single band of every COG.
+
+    A new band is created on each call, as callers may modify it through the
+    Item or Collection it ends up in.
+    """
+    return RasterBand.create(nodata=NO_DATA_VALUE,
+                             sampling=Sampling.AREA,
+                             data_type=DataType.UINT8,
+                             spatial_resolution=30)
+
+
+# Extensions of every Item, and the extensions only used on the COG asset.
+# Items list them directly, so the extensions do not each have to check for
+# and add their schema.
+_ITEM_EXTENSIONS = (
+    ProjectionExtension.get_schema_uri(),
+    LabelExtension.get_schema_uri(),
+    ScientificExtension.get_schema_uri(),
+)
+_COG_ASSET_EXTENSIONS = (
+    FileExtension.get_schema_uri(),
+    RasterExtension.get_schema_uri(),
+)
+
+
+def _item_label_properties() -> Dict[str, Any]:
+    """The label fields of every Item, set through the label extension once
+    on a template Item."""
+    template = pystac.Item(id="template",
+                           geometry=None,
+                           bbox=None,
+                           datetime=datetime(2015, 1, 1, tzinfo=timezone.utc),
+                           properties={})
+    item_label = LabelExtension.ext(template, add_if_missing=True)
+    item_label.label_type = LabelType.RASTER
+    item_label.label_tasks = [LabelTask.CLASSIFICATION]
+    item_label.label_properties = None
+    item_label.label_description = ""
+    item_label.label_classes = [
+        # TODO: The STAC Label extension JSON Schema is incorrect.
+        # https://github.com/stac-extensions/label/pull/8
+        # https://github.com/stac-utils/pystac/issues/611
+        # When it is fixed, this should be None, not the empty string.
+        LabelClasses.create(list(_CLASSIFICATION_NAMES), "")
+    ]
+    return {
+        key: value
+        for key, value in template.properties.items()
+        if key.startswith("label:")
+    }
+
+
+# Deep-copied into every Item, as callers may modify the values through the
+# Item.
+_ITEM_LABEL_PROPERTIES = _item_label_properties()
+
+
+def _ring_bounds(ring: List[List[float]]) -> Tuple[float, float, float, float]:
+    """Bounds of a linear ring, as (min x, min y, max x, max y)."""
+    xs = [point[0] for point in ring]
+    ys = [point[1] for point in ring]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def _bbox_equal(a: List[float],
+                b: List[float],
+                tolerance: float = 1e-6) -> bool:
+    """Whether two bboxes are the same, ignoring floating point noise."""
+    return len(a) == len(b) and all(
+        abs(x - y) <= tolerance for x, y in zip(a, b))
+
+
+def _bbox_polygon(bbox: List[float]) -> Dict[str, Any]:
+    """GeoJSON Polygon of a bbox, with a counter-clockwise exterior ring
+    like shapely's `box(*bbox, ccw=True)`."""
+    min_x, min_y, max_x, max_y = bbox
+    return {
+        "type":
+        "Polygon",
+        "coordinates": [[
+            [max_x, min_y],
+            [max_x, max_y],
+            [min_x, max_y],
+            [min_x, min_y],
+            [max_x, min_y],
+        ]],
+    }
+
+
+@lru_cache(maxsize=None)
+def _get_transformer(src_epsg: int, dst_epsg: int) -> Transformer:
+    """Transformer between two EPSG codes, built once per process rather than
+    once per COG."""
+    return Proj.from_crs(CRS.from_epsg(src_epsg),
+                         CRS.from_epsg(dst_epsg),
+                         always_xy=True)
+
+
+def _metadata_fields(metadata: Dict[str, Any]) -> _MetadataFields:
+    """Parses the fields of the metadata shared by the Collection and every
+    Item."""
+    title = metadata["tiff_metadata"]["dct:title"]
+    year = title.split(" ")[0]
+    start_datetime = datetime(int(year), 1, 1, tzinfo=timezone.utc)
+    geometry = metadata["geom_metadata"]
+    return _MetadataFields(
+        title=title,
+        description=metadata["description_metadata"]["dct:description"],
+        start_datetime=start_datetime,
+        end_datetime=start_datetime.replace(year=start_datetime.year + 5),
+        geometry=geometry,
+        bbox=_ring_bounds(geometry["coordinates"][0]),
+    )
+
+
+# Modification time and size of a local file
+_FileVersion = Tuple[int, int]
+
+
+def _local_file_version(href: str) -> Optional[_FileVersion]:
+    """The modification time and size of a local file, or None if the href
+    is not a local file."""
+    try:
+        stat = os.stat(href)
+    except (OSError, ValueError):
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class _CogHeader(NamedTuple):
+    bounds: Tuple[float, float, float, float]
+    transform: Tuple[float, ...]
+    shape: Tuple[int, int]
+
+
+def _read_cog_header(href: str) -> _CogHeader:
+    """Bounds, transform and shape of a COG, read from its header."""
+    # Only the header is read, and the dataset is closed straight after
+    with rasterio.Env(**COG_READ_CONFIG), rasterio.open(href) as dataset:
+        left, bottom, right, top = dataset.bounds
+        return _CogHeader(bounds=(left, bottom, right, top),
+                          transform=tuple(dataset.transform),
+                          shape=(dataset.height, dataset.width))
+
+
+@lru_cache(maxsize=1024)
+def _read_local_cog_header(href: str, version: _FileVersion) -> _CogHeader:
+    """The header of a local COG, read once per href and version.
+
+    The version is the file's modification time and size, so that a COG
+    written again at the same path is read again. Remote COGs have no such
+    version, so they are not cached.
+    """
+    return _read_cog_header(href)
+
+
 def get_cog_geom(href: Optional[str], metadata: Dict[str,
                                                      Any]) -> Dict[str, Any]:
+    return _cog_geom(href, _metadata_fields(metadata))
+
+
+def _cog_geom(href: Optional[str], fields: _MetadataFields) -> Dict[str, Any]:
     if href is not None:
-        with rasterio.open(href) as dataset:
-            cog_bbox = list(dataset.bounds)
-            cog_transform = list(dataset.transform)
-            cog_shape = [dataset.height, dataset.width]
-
-            # If cog is the full dataset, use the bbox from the metadata
-            if cog_bbox == FULL_DATASET_BBOX:
-                tiled = False
-                geometry = metadata["geom_metadata"]
-                bbox = list(Polygon(geometry.get("coordinates")[0]).bounds)
-            else:
-                tiled = True
-                transformer = Proj.from_crs(CRS.from_epsg(LANDCOVER_EPSG),
-                                            CRS.from_epsg(4326),
-                                            always_xy=True)
-                bbox = list(
-                    transformer.transform_bounds(dataset.bounds.left,
-                                                 dataset.bounds.bottom,
-                                                 dataset.bounds.right,
-                                                 dataset.bounds.top))
-                geometry = geojson_mapping(box(*bbox, ccw=True))
+        version = _local_file_version(href)
+        if version is None:
+            header = _read_cog_header(href)
+        else:
+            header = _read_local_cog_header(href, version)
+        bounds, transform, shape = header
+        cog_bbox = list(bounds)
+        cog_transform = list(transform)
+        cog_shape = list(shape)
+
+        # If cog is the full dataset, use the bbox from the metadata
+        if _bbox_equal(cog_bbox, FULL_DATASET_BBOX):
+            tiled = False
+            geometry = deepcopy(fields.geometry)
+            bbox = list(fields.bbox)
+        else:
+            tiled = True
+            transformer = _get_transformer(LANDCOVER_EPSG, 4326)
+            bbox = list(transformer.transform_bounds(*bounds))
+            geometry = _bbox_polygon(bbox)
     else:
         # Use values from the metadata
-        geometry = metadata["geom_metadata"]
-        bbox = list(Polygon(geometry.get("coordinates")[0]).bounds)
+        geometry = deepcopy(fields.geometry)
+        bbox = list(fields.bbox)
         tiled = False
         cog_bbox = []
         cog_transform = []
@@ -100,7 +286,10 @@ def create_item(metadata: Dict[str, Any],
                 cog_href: Optional[str] = None,
                 cog_href_modifier: Optional[ReadHrefModifier] = None,
                 extent_asset_href: Optional[str] = None,
-                thumbnail_url: str = THUMBNAIL_HREF) -> pystac.Item:
+                thumbnail_url: str = THUMBNAIL_HREF,
+                fetch_size: bool = True,
+                include_wkt2: bool = True,
+                fields: Optional[_MetadataFields] = None) -> pystac.Item:
     """Creates a STAC item for a Natural Resources Canada Land Cover dataset.
 
     Args:
@@ -110,6 +299,13 @@ def create_item(metadata: Dict[str, Any],
         cog_href (str, optional): Path to COG asset.
         extent_asset_href (str, optional): Path to extent GeoJSON file.
         thumbnail_url (str, optional): URL for thumbnail image.
+        fetch_size (bool, optional): Set `file:size` on the COG asset. For a
+            remote COG this costs a HEAD request. Defaults to True.
+        include_wkt2 (bool, optional): Set `proj:wkt2` alongside the EPSG
+            code. The WKT is most of the size of the Item's JSON.
+            Defaults to True.
+        fields (optional): The fields already parsed from the metadata, as
+            create_items passes to each Item. Parsed here by default.
 
     Returns:
         pystac.Item: STAC Item object.
@@ -124,24 +320,19 @@ def create_item(metadata: Dict[str, Any],
     if cog_href and cog_href_modifier:
         cog_access_href = cog_href_modifier(cog_href)
 
-    title = metadata["tiff_metadata"]["dct:title"]
-    description = metadata["description_metadata"]["dct:description"]
-
-    utc = pytz.utc
-
-    year = title.split(" ")[0]
-    dataset_datetime = utc.localize(datetime.strptime(year, "%Y"))
-
-    end_datetime = dataset_datetime + relativedelta(years=5)
-
-    start_datetime = dataset_datetime
-    end_datetime = end_datetime
+    if fields is None:
+        fields = _metadata_fields(metadata)
+    title = fields.title
+    description = fields.description
+    dataset_datetime = fields.start_datetime
+    start_datetime = fields.start_datetime
+    end_datetime = fields.end_datetime
 
     if cog_href is not None:
         id = os.path.basename(cog_href).replace("_cog", "").replace(".tif", "")
     else:
         id = title.replace(" ", "-")
-    cog_geom = get_cog_geom(cog_access_href, metadata)
+    cog_geom = _cog_geom(cog_access_href, fields)
     bbox = cog_geom["bbox"]
     geometry = cog_geom["geometry"]
     tiled = cog_geom["tiled"]
@@ -158,35 +349,25 @@ def create_item(metadata: Dict[str, Any],
         bbox=bbox,
         datetime=dataset_datetime,
         properties=properties,
-        stac_extensions=[],
+        stac_extensions=list(_ITEM_EXTENSIONS),
     )
 
     if start_datetime and end_datetime:
         item.common_metadata.start_datetime = start_datetime
         item.common_metadata.end_datetime = end_datetime
 
-    item_projection = ProjectionExtension.ext(item, add_if_missing=True)
+    item_projection = ProjectionExtension.ext(item)
     item_projection.epsg = LANDCOVER_EPSG
-    item_projection.wkt2 = LANDCOVER_CRS_WKT
+    if include_wkt2:
+        item_projection.wkt2 = LANDCOVER_CRS_WKT
     if cog_href is not None:
         item_projection.bbox = cog_geom["cog_bbox"]
         item_projection.transform = cog_geom["transform"]
         item_projection.shape = cog_geom["shape"]
 
-    item_label = LabelExtension.ext(item, add_if_missing=True)
-    item_label.label_type = LabelType.RASTER
-    item_label.label_tasks = [LabelTask.CLASSIFICATION]
-    item_label.label_properties = None
-    item_label.label_description = ""
-    item_label.label_classes = [
-        # TODO: The STAC Label extension JSON Schema is incorrect.
-        # https://github.com/stac-extensions/label/pull/8
-        # https://github.com/stac-utils/pystac/issues/611
-        # When it is fixed, this should be None, not the empty string.
-        LabelClasses.create(list(CLASSIFICATION_VALUES.values()), "")
-    ]
+    item.properties.update(deepcopy(_ITEM_LABEL_PROPERTIES))
 
-    item_sci = ScientificExtension.ext(item, add_if_missing=True)
+    item_sci = ScientificExtension.ext(item)
     item_sci.doi = DOI
     item_sci.citation = CITATION
 
@@ -233,37 +414,88 @@ def create_item(metadata: Dict[str, Any],
             title="Land cover of Canada COG",
         )
         item.add_asset("landcover", cog_asset)
+        item.stac_extensions.extend(_COG_ASSET_EXTENSIONS)
         # File Extension
-        cog_asset_file = FileExtension.ext(cog_asset, add_if_missing=True)
+        cog_asset_file = FileExtension.ext(cog_asset)
         # The following odd type annotation is needed
-        mapping: List[Any] = [{
-            "values": [value],
-            "summary": summary
-        } for value, summary in CLASSIFICATION_VALUES.items()]
+        mapping: List[Any] = _file_values()
         cog_asset_file.values = mapping
-        with fsspec.open(cog_access_href) as file:
-            size = file.size
+        if fetch_size:
+            # Only the size is needed, so the COG is stat'ed rather than
+            # opened a second time
+            fs, cog_path = url_to_fs(cog_access_href)
+            size = fs.size(cog_path)
             if size is not None:
                 cog_asset_file.size = size
         # Raster Extension
-        cog_asset_raster = RasterExtension.ext(cog_asset, add_if_missing=True)
-        cog_asset_raster.bands = [
-            RasterBand.create(nodata=NO_DATA_VALUE,
-                              sampling=Sampling.AREA,
-                              data_type=DataType.UINT8,
-                              spatial_resolution=30)
-        ]
+        cog_asset_raster = RasterExtension.ext(cog_asset)
+        cog_asset_raster.bands = [_cog_raster_band()]
         # Projection Extension
-        cog_asset_projection = ProjectionExtension.ext(cog_asset,
-                                                       add_if_missing=True)
-        cog_asset_projection.epsg = item_projection.epsg
-        cog_asset_projection.wkt2 = item_projection.wkt2
-        cog_asset_projection.bbox = item_projection.bbox
-        cog_asset_projection.transform = item_projection.transform
-        cog_asset_projection.shape = item_projection.shape
+        # The asset has the same projection fields as the Item, which already
+        # lists the extension. They are copied as they were written, rather
+        # than through the extension's setters again.
+        cog_asset.extra_fields.update(
+            (key, value) for key, value in item.properties.items()
+            if key.startswith("proj:"))
     return item
 
 
+def create_items(
+    metadata: Dict[str, Any],
+    destination: str,
+    cog_hrefs: List[str],
+    metadata_url: str = JSONLD_HREF,
+    cog_href_modifier: Optional[ReadHrefModifier] = None,
+    thumbnail_url: str = THUMBNAIL_HREF,
+    fetch_size: bool = True,
+    include_wkt2: bool = True,
+    max_workers: Optional[int] = None,
+    extent_asset_hrefs: Optional[List[Optional[str]]] = None
+) -> List[pystac.Item]:
+    """Creates a STAC item for each of many COGs of a Natural Resources
+    Canada Land Cover dataset.
+
+    Creating an Item mostly waits on reading the header and size of its COG,
+    so the Items are created in a thread pool.
+
+    Args:
+        metadata (dict): Parsed metadata.
+        destination (str): Directory where the Items will be stored.
+        cog_hrefs (list): Paths to the COG assets, one per Item.
+        metadata_url (str, optional): Path to provider metadata.
+        thumbnail_url (str, optional): URL for thumbnail image.
+        fetch_size (bool, optional): Set `file:size` on the COG assets. For
+            remote COGs this costs a HEAD request per COG. Defaults to True.
+        include_wkt2 (bool, optional): Set `proj:wkt2` alongside the EPSG
+            code. Defaults to True.
+        max_workers (int, optional): Number of threads. Defaults to the
+            ThreadPoolExecutor default.
+        extent_asset_hrefs (list, optional): Paths to extent GeoJSON files,
+            one per Item.
+
+    Returns:
+        list: STAC Item objects, in the order of cog_hrefs.
+    """
+    # The shared fields are parsed once, and only read by the threads
+    fields = _metadata_fields(metadata)
+    if extent_asset_hrefs is None:
+        extent_asset_hrefs = [None] * len(cog_hrefs)
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return list(
+            ex.map(
+                lambda cog_href, extent_asset_href: create_item(
+                    metadata,
+                    destination,
+                    metadata_url,
+                    cog_href,
+                    cog_href_modifier,
+                    extent_asset_href=extent_asset_href,
+                    thumbnail_url=thumbnail_url,
+                    fetch_size=fetch_size,
+                    include_wkt2=include_wkt2,
+                    fields=fields), cog_hrefs, extent_asset_hrefs))
+
+
 def create_collection(
         metadata: Dict[str, Any],
         metadata_url: str = JSONLD_HREF,
@@ -274,7 +506,7 @@ def create_collection(
 
     Args:
         metadata (dict): metadata parsed from jsonld
-        metadata_url (str, optional): Location to save the output STAC Collection json
+        metadata_url (str, optional): Path to provider metadata.
         thumbnail_url (str, optional): URL to a thumbnail image for the Collection
 
     Returns:
@@ -282,17 +514,10 @@ def create_collection(
     """
     # Creates a STAC collection for a Natural Resources Canada Land Cover dataset
 
-    title = metadata["tiff_metadata"]["dct:title"]
-
-    utc = pytz.utc
-    year = title.split(" ")[0]
-    dataset_datetime = utc.localize(datetime.strptime(year, "%Y"))
-
-    start_datetime = dataset_datetime  # type: Optional[datetime]
-    end_datetime = dataset_datetime + relativedelta(years=5)
-
-    geometry = metadata["geom_metadata"]
-    bbox = list(Polygon(geometry.get("coordinates")[0]).bounds)
+    fields = _metadata_fields(metadata)
+    start_datetime = fields.start_datetime  # type: Optional[datetime]
+    end_datetime = fields.end_datetime  # type: Optional[datetime]
+    bbox = list(fields.bbox)
 
     collection = pystac.Collection(
         id=LANDCOVER_ID,
@@ -339,7 +564,7 @@ def create_collection(
         # https://github.com/stac-extensions/label/pull/8
         # https://github.com/stac-utils/pystac/issues/611
         # When it is fixed, this should be None, not the empty string.
-        LabelClasses.create(list(CLASSIFICATION_VALUES.values()), "")
+        LabelClasses.create(list(_CLASSIFICATION_NAMES), "")
     ]
 
     collection_proj = ProjectionExtension.summaries(collection,
@@ -369,27 +594,16 @@ def create_collection(
             )),
         "landcover":
         AssetDefinition({
-            "type":
-            pystac.MediaType.COG,
+            "type": pystac.MediaType.COG,
             "roles": [
                 "data",
                 "labels",
                 "labels-raster",
             ],
-            "title":
-            "Land cover of Canada COG",
-            "raster:bands": [
-                RasterBand.create(nodata=NO_DATA_VALUE,
-                                  sampling=Sampling.AREA,
-                                  data_type=DataType.UINT8,
-                                  spatial_resolution=30).to_dict()
-            ],
-            "file:values": [{
-                "values": [value],
-                "summary": summary
-            } for value, summary in CLASSIFICATION_VALUES.items()],
-            "proj:epsg":
-            collection_proj.epsg[0]
+            "title": "Land cover of Canada COG",
+            "raster:bands": [_cog_raster_band().to_dict()],
+            "file:values": _file_values(),
+            "proj:epsg": collection_proj.epsg[0]
         }),
         "extent":
         AssetDefinition(
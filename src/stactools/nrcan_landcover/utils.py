@@ -1,13 +1,58 @@
+import hashlib
 import json
+import logging
 import os
 import shutil
-from tempfile import mkdtemp
-from typing import Any, Dict
+import time
+from copy import deepcopy
+from functools import lru_cache
+from tempfile import mkdtemp, mkstemp
+from typing import Any, Callable, Dict, Optional, Union
 from urllib.parse import urlparse
 from zipfile import ZipFile
 
 import requests
 
+from stactools.nrcan_landcover.constants import METADATA_CACHE_TTL
+
+# Use orjson if available
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Shared by every request, so that connections to a host are re-used
+_session = requests.Session()
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parses JSON, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any) -> str:
+    """Serializes to compact JSON, with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def write_json(obj: Any, path: str) -> None:
+    """Writes compact JSON to a local file, with orjson if it is installed.
+
+    Without orjson the JSON is serialized straight into the file.
+    """
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj))
+    else:
+        with open(path, "w") as f:
+            json.dump(obj, f, separators=(",", ":"))
+
 
 def _unzip_dir(zip_path: str, unzip_dir: str) -> str:
     with ZipFile(zip_path, 'r') as zip_ref:
@@ -23,10 +68,13 @@ def download_asset_package(metadata: Dict[str, Any]) -> str:
 
     if access_url.startswith("http"):
         tmp_path = os.path.join(tmp_dir, 'file.zip')
-        resp = requests.get(access_url)
-
-        with open(tmp_path, 'wb') as f:
-            f.write(resp.content)
+        with _session.get(access_url, stream=True, timeout=60) as resp:
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            with open(tmp_path, 'wb') as f:
+                # Stream to disk in 1 MiB chunks rather than buffering the
+                # whole archive in memory.
+                shutil.copyfileobj(resp.raw, f, 1024 * 1024)
 
         asset_package_path = _unzip_dir(tmp_path, tmp_dir)
     else:
@@ -39,46 +87,197 @@ def remove_asset_package(dirpath: str) -> None:
     shutil.rmtree(dirpath)
 
 
+def get_cache_dir() -> str:
+    """Gets the directory used to cache downloads, creating it if needed.
+
+    Follows the XDG base directory spec, i.e. `$XDG_CACHE_HOME` or
+    `~/.cache`.
+
+    Returns:
+        str: Path to the cache directory.
+    """
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    cache_dir = os.path.join(cache_home, "nrcan_landcover")
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Writes a file through a temporary file in the same directory, so that
+    other processes never read it partially written."""
+    fd, tmp_path = mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def download_cached(url: str,
+                    on_chunk: Optional[Callable[[bytes], None]] = None) -> str:
+    """Downloads a file into the cache, re-using an earlier download when
+    the server reports that the file is unchanged.
+
+    The ETag (or Last-Modified) header of the remote file is stored next to
+    the download and compared on subsequent calls.
+
+    Args:
+        url (str): url of the file to download.
+        on_chunk (Callable, optional): Called with each chunk of the file as
+            it is downloaded. Not called when the cached file is re-used.
+
+    Returns:
+        str: Local path to the downloaded file.
+    """
+    entry_dir = os.path.join(get_cache_dir(), _cache_key(url))
+    file_path = os.path.join(entry_dir, url.split('/').pop())
+    validator_path = os.path.join(entry_dir, "validator")
+
+    validator: Optional[str] = None
+    try:
+        head = _session.head(url, allow_redirects=True, timeout=60)
+        head.raise_for_status()
+        validator = (head.headers.get("ETag")
+                     or head.headers.get("Last-Modified"))
+    except requests.RequestException as e:
+        # Some servers do not support HEAD, the file is downloaded instead
+        logger.debug(f"HEAD request for {url} failed: {e}")
+
+    if validator and os.path.exists(file_path) and os.path.exists(
+            validator_path):
+        with open(validator_path) as f:
+            if f.read() == validator:
+                logger.info(f"Using cached download: {file_path}")
+                return file_path
+
+    os.makedirs(entry_dir, exist_ok=True)
+    fd, tmp_path = mkstemp(dir=entry_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with _session.get(url, stream=True, timeout=60) as resp:
+                resp.raise_for_status()
+                resp.raw.decode_content = True
+                logger.debug(f"Writing {url} to {file_path}")
+                # Stream to disk in 1 MiB chunks rather than buffering the
+                # whole file in memory.
+                for chunk in iter(lambda: resp.raw.read(1024 * 1024), b""):
+                    f.write(chunk)
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    if validator:
+        _write_atomic(validator_path, validator.encode())
+    elif os.path.exists(validator_path):
+        os.remove(validator_path)
+
+    return file_path
+
+
+def _get_cached_json(url: str) -> Any:
+    """Gets a JSON document, re-using a cached copy younger than
+    METADATA_CACHE_TTL seconds.
+
+    An older copy is revalidated with a conditional request, using the
+    ETag and Last-Modified headers it was served with, and re-used if the
+    server reports that the document is unchanged.
+    """
+    cache_path = os.path.join(get_cache_dir(), _cache_key(url) + ".json")
+    validators_path = os.path.join(get_cache_dir(),
+                                   _cache_key(url) + ".validators")
+    headers = {}
+    if os.path.exists(cache_path):
+        if (time.time() - os.path.getmtime(cache_path)) < METADATA_CACHE_TTL:
+            with open(cache_path, 'rb') as f:
+                return json_loads(f.read())
+        if os.path.exists(validators_path):
+            with open(validators_path, 'rb') as f:
+                validators = json_loads(f.read())
+            if validators.get("ETag"):
+                headers["If-None-Match"] = validators["ETag"]
+            if validators.get("Last-Modified"):
+                headers["If-Modified-Since"] = validators["Last-Modified"]
+
+    response = _session.get(url, headers=headers, timeout=60)
+    if response.status_code == 304:
+        logger.info(f"Using cached metadata: {cache_path}")
+        # Fresh for another METADATA_CACHE_TTL seconds
+        os.utime(cache_path)
+        with open(cache_path, 'rb') as f:
+            return json_loads(f.read())
+    response.raise_for_status()
+    _write_atomic(cache_path, response.content)
+    _write_atomic(
+        validators_path,
+        json_dumps({
+            "ETag": response.headers.get("ETag"),
+            "Last-Modified": response.headers.get("Last-Modified"),
+        }).encode())
+    return json_loads(response.content)
+
+
 def get_metadata(metadata_url: str) -> Dict[str, Any]:
     """Gets metadata from the various formats published by NRCan.
 
+    The metadata is parsed once per url and process. Every call returns
+    its own copy, which the caller may modify.
+
     Args:
         metadata_url (str): url to get metadata from.
 
     Returns:
         dict: Land Cover Metadata.
     """
+    return deepcopy(_parse_metadata(metadata_url))
+
+
+@lru_cache(maxsize=8)
+def _parse_metadata(metadata_url: str) -> Dict[str, Any]:
+    """Parses the metadata at a url, shared by every call to
+    `get_metadata`."""
     if metadata_url.endswith(".jsonld"):
         if metadata_url.startswith("http"):
-            metadata_response = requests.get(metadata_url)
-            jsonld_response = metadata_response.json()
+            jsonld_response = _get_cached_json(metadata_url)
         else:
-            with open(metadata_url) as f:
-                jsonld_response = json.load(f)
-
-        tiff_metadata = [
-            i for i in jsonld_response.get("@graph")
-            if i.get("dct:format") == "TIFF"
-        ][0]
-
-        geom_obj = next(
-            (x["locn:geometry"] for x in jsonld_response["@graph"]
-             if "locn:geometry" in x.keys()),
-            [],
-        )  # type: Any
+            with open(metadata_url, 'rb') as f:
+                jsonld_response = json_loads(f.read())
+
+        # The first TIFF, geometry and description nodes, found in one pass
+        tiff_metadata = None
+        geom_obj = None  # type: Any
+        description_metadata = None
+        for node in jsonld_response["@graph"]:
+            if tiff_metadata is None and node.get("dct:format") == "TIFF":
+                tiff_metadata = node
+            if geom_obj is None and "locn:geometry" in node:
+                geom_obj = node["locn:geometry"]
+            if description_metadata is None and "dct:description" in node:
+                description_metadata = node
+            if (tiff_metadata is not None and geom_obj is not None
+                    and description_metadata is not None):
+                break
+        if tiff_metadata is None:
+            raise ValueError("Unable to find TIFF metadata in jsonld")
+        if description_metadata is None:
+            raise ValueError("Unable to find description metadata in jsonld")
+
         geom_metadata = next(
-            (json.loads(x["@value"])
-             for x in geom_obj if x["@type"].startswith("http")),
+            (json_loads(x["@value"])
+             for x in geom_obj or [] if x["@type"].startswith("http")),
             None,
         )
         if not geom_metadata:
             raise ValueError("Unable to parse geometry metadata from jsonld")
 
-        description_metadata = [
-            i for i in jsonld_response.get("@graph")
-            if "dct:description" in i.keys()
-        ][0]
-
         metadata = {
             "tiff_metadata": tiff_metadata,
             "geom_metadata": geom_metadata,
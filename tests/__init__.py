@@ -1,3 +1,27 @@
+import atexit
+import os
+from functools import lru_cache
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
 from stactools.testing import TestData
 
+from stactools.nrcan_landcover import cog
+
 test_data = TestData(__file__)
+
+
+@lru_cache(maxsize=None)
+def get_test_cog() -> str:
+    """Gets a COG of the first .tif data file, shared by all the tests.
+
+    The COG is created on first use, in a temporary directory that is removed
+    when the test run ends.
+    """
+    with os.scandir(test_data.get_path("data-files")) as it:
+        entry = next(e for e in it if e.name.lower().endswith(".tif"))
+    tmp_dir = TemporaryDirectory()
+    atexit.register(tmp_dir.cleanup)
+    return cog.create_cog(
+        entry.path,
+        os.path.join(tmp_dir.name, f"{Path(entry.name).stem}_cog.tif"))
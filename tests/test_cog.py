@@ -0,0 +1,213 @@
+import os
+import struct
+import unittest
+import zlib
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+import numpy
+import rasterio
+from rasterio.windows import Window
+
+from stactools.nrcan_landcover import cog
+from tests import test_data
+
+DATA = bytes(range(256)) * 4096
+
+
+class _Unseekable:
+    """A write-only stream, so that zipfile writes data descriptors."""
+    def __init__(self):
+        self.buffer = BytesIO()
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+
+def _zip(name="example.tif", compression=ZIP_DEFLATED, seekable=True):
+    stream = BytesIO() if seekable else _Unseekable()
+    with ZipFile(stream, "w", compression) as zip_ref:
+        zip_ref.writestr(name, DATA)
+    return (stream if seekable else stream.buffer).getvalue()
+
+
+def _chunks(archive, size=7):
+    return iter([archive[i:i + size] for i in range(0, len(archive), size)])
+
+
+def _flip(archive, offset):
+    corrupt = bytearray(archive)
+    corrupt[offset] ^= 0xff
+    return bytes(corrupt)
+
+
+class InflateFirstMemberTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+
+    def inflate(self, archive):
+        return cog._inflate_first_member(_chunks(archive), self.tmp_dir)
+
+    def assertInflated(self, path):
+        self.assertEqual(path, os.path.join(self.tmp_dir, "example.tif"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+
+    def test_inflate(self):
+        self.assertInflated(self.inflate(_zip()))
+
+    def test_inflate_data_descriptor(self):
+        archive = _zip(seekable=False)
+        # Bit 3 of the flags, the CRC is in the data descriptor
+        self.assertTrue(struct.unpack_from("<H", archive, 6)[0] & 0x8)
+
+        self.assertInflated(self.inflate(archive))
+
+    def test_crc_mismatch(self):
+        # The CRC in the local header
+        with self.assertRaisesRegex(ValueError, "CRC mismatch"):
+            self.inflate(_flip(_zip(), 14))
+
+    def test_data_descriptor_crc_mismatch(self):
+        archive = _zip(seekable=False)
+        descriptor = archive.rindex(b"PK\x07\x08")
+
+        with self.assertRaisesRegex(ValueError, "CRC mismatch"):
+            self.inflate(_flip(archive, descriptor + 4))
+
+    def test_corrupt(self):
+        archive = _zip()
+        with self.assertRaises((ValueError, zlib.error)):
+            self.inflate(_flip(archive, len(archive) // 4))
+
+    def test_truncated(self):
+        archive = _zip()
+        with self.assertRaisesRegex(ValueError, "Unexpected end"):
+            self.inflate(archive[:len(archive) // 4])
+        with self.assertRaisesRegex(ValueError, "Unexpected end"):
+            self.inflate(archive[:20])
+
+    def test_unsupported(self):
+        with self.assertRaisesRegex(ValueError, "not a TIFF"):
+            self.inflate(_zip(name="example.txt"))
+        with self.assertRaisesRegex(ValueError, "Unsupported"):
+            self.inflate(_zip(compression=ZIP_STORED))
+
+
+class RetileTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        self.input_path = test_data.get_path("data-files/example2015.tif")
+
+    def retile(self, input_path):
+        # Rounded up to whole blocks, 512x32 pixel tiles, i.e. 2 columns and
+        # 12 rows of tiles
+        with mock.patch.object(cog, "TILING_PIXEL_SIZE", (500, 20)):
+            return cog.create_retiled_cogs(input_path,
+                                           self.tmp_dir,
+                                           block_size=32)
+
+    def test_create_retiled_cogs(self):
+        cog_paths = self.retile(self.input_path)
+
+        self.assertEqual(
+            sorted(os.path.basename(path) for path in cog_paths),
+            sorted(f"example2015_{row:02d}_{col:02d}_cog.tif"
+                   for row in range(1, 13) for col in range(1, 3)))
+        with rasterio.open(self.input_path) as src:
+            for row in range(12):
+                for col in range(2):
+                    # The last row and column of tiles are cut off
+                    window = Window(col * 512, row * 32,
+                                    min(512, src.width - col * 512),
+                                    min(32, src.height - row * 32))
+                    path = os.path.join(
+                        self.tmp_dir,
+                        f"example2015_{row + 1:02d}_{col + 1:02d}_cog.tif")
+                    with rasterio.open(path) as tile:
+                        self.assertEqual(
+                            (tile.width, tile.height),
+                            (int(window.width), int(window.height)))
+                        self.assertEqual(tile.bounds,
+                                         src.window_bounds(window))
+                        self.assertEqual(tile.crs, src.crs)
+                        self.assertTrue(
+                            numpy.array_equal(tile.read(1),
+                                              src.read(1, window=window)))
+
+    def test_empty_tiles_are_skipped(self):
+        input_path = os.path.join(self.tmp_dir, "example2015.tif")
+        with rasterio.open(self.input_path) as src:
+            profile = src.profile
+            data = src.read()
+        # Clear the second row of tiles
+        data[:, 32:64, :] = 0
+        with rasterio.open(input_path, "w", **profile) as dst:
+            dst.write(data)
+
+        cog_paths = self.retile(input_path)
+
+        self.assertEqual(len(cog_paths), 22)
+        for col in range(1, 3):
+            path = os.path.join(self.tmp_dir,
+                                f"example2015_02_{col:02d}_cog.tif")
+            self.assertNotIn(path, cog_paths)
+            self.assertFalse(os.path.exists(path))
+
+    def test_failed_tiles_are_not_returned(self):
+        # A directory in the way of a tile's COG makes writing it fail
+        blocked = os.path.join(self.tmp_dir, "example2015_01_01_cog.tif")
+        os.mkdir(blocked)
+
+        with mock.patch.object(cog, "TILING_PIXEL_SIZE", (500, 20)):
+            cog_paths = cog.create_retiled_cogs(self.input_path,
+                                                self.tmp_dir,
+                                                raise_on_fail=False,
+                                                block_size=32)
+
+        self.assertEqual(len(cog_paths), 23)
+        self.assertNotIn(blocked, cog_paths)
+        with self.assertRaises(Exception):
+            self.retile(self.input_path)
+
+
+class CreateCogTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        self.cog_path = cog.create_cog(
+            test_data.get_path("data-files/example2015.tif"),
+            os.path.join(self.tmp_dir, "example2015_cog.tif"))
+        self.output_path = os.path.join(self.tmp_dir, "copy_cog.tif")
+
+    def test_existing_cog_is_copied(self):
+        with mock.patch.object(rasterio.shutil, "copy") as copy:
+            cog.create_cog(self.cog_path, self.output_path)
+        copy.assert_not_called()
+
+        with open(self.cog_path, "rb") as src, open(self.output_path,
+                                                    "rb") as dst:
+            self.assertEqual(dst.read(), src.read())
+        self.assertFalse(os.path.samefile(self.cog_path, self.output_path))
+        self.assertEqual(os.stat(self.cog_path).st_nlink, 1)
+
+    def test_existing_cog_is_linked(self):
+        cog.create_cog(self.cog_path, self.output_path, link=True)
+
+        self.assertTrue(os.path.samefile(self.cog_path, self.output_path))
+
+    def test_existing_cog_is_encoded_with_level(self):
+        with mock.patch.object(rasterio.shutil, "copy") as copy:
+            cog.create_cog(self.cog_path, self.output_path, level=1)
+        copy.assert_called_once()
+        self.assertEqual(copy.call_args.kwargs["level"], 1)
@@ -1,15 +1,60 @@
 import json
 import os
+import re
+import shutil
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
 from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import mock
+from zipfile import ZIP_DEFLATED, ZipFile
 
+import numpy
 import pystac
+import rasterio
 from stactools.testing import CliTestCase
 
+from stactools.nrcan_landcover import commands, utils
 from stactools.nrcan_landcover.commands import create_nrcanlandcover_command
-from tests import test_data
+from tests import get_test_cog, test_data
+
+# The GeoJSON geometry of the metadata written by write_metadata
+GEOMETRY = ('{"type": "Polygon", "coordinates": '
+            '[[[-141, 41], [-52, 41], [-52, 84], [-141, 84], [-141, 41]]]}')
+
+
+def write_metadata(directory, access_url):
+    """Writes a JSON-LD metadata file for the TIFF at access_url, so that
+    the commands can run without fetching the NRCan metadata."""
+    metadata_path = os.path.join(directory, "metadata.jsonld")
+    with open(metadata_path, "w") as f:
+        json.dump(
+            {
+                "@graph": [{
+                    "dct:format": "TIFF",
+                    "dct:title": "2015 Land Cover of Canada",
+                    "dcat:accessURL": {
+                        "@id": access_url
+                    },
+                }, {
+                    "locn:geometry": [{
+                        "@type": "http://www.opengis.net/ont/geosparql",
+                        "@value": GEOMETRY
+                    }]
+                }, {
+                    "dct:description": "Land cover"
+                }]
+            }, f)
+    return metadata_path
 
 
 class CreateCollectionTest(CliTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cog_path = get_test_cog()
+
     def create_subcommand_functions(self):
         return [create_nrcanlandcover_command]
 
@@ -21,20 +66,18 @@ class CreateCollectionTest(CliTestCase):
                              0,
                              msg="\n{}".format(result.output))
 
-            jsons = [p for p in os.listdir(tmp_dir) if p.endswith(".json")]
-            self.assertEqual(len(jsons), 1)
+            collection_path = os.path.join(tmp_dir, "collection.json")
+            self.assertTrue(os.path.exists(collection_path))
 
-            collection = pystac.read_file(os.path.join(tmp_dir, jsons[0]))
+            collection = pystac.read_file(collection_path)
 
             collection.validate()
 
     def test_create_cog(self):
         with TemporaryDirectory() as tmp_dir:
             test_path = test_data.get_path("data-files")
-            paths = [
-                os.path.join(test_path, d) for d in os.listdir(test_path)
-                if d.lower().endswith(".tif")
-            ]
+            with os.scandir(test_path) as it:
+                paths = [e.path for e in it if e.name.lower().endswith(".tif")]
 
             for path in paths:
                 result = self.run_command([
@@ -44,35 +87,46 @@ class CreateCollectionTest(CliTestCase):
                                  0,
                                  msg="\n{}".format(result.output))
 
-                cogs = [
-                    p for p in os.listdir(tmp_dir) if p.endswith("_cog.tif")
-                ]
-                self.assertEqual(len(cogs), 1)
+                output_path = os.path.join(tmp_dir,
+                                           f"{Path(path).stem}_cog.tif")
+                self.assertTrue(os.path.exists(output_path))
 
     def test_create_item(self):
         with TemporaryDirectory() as tmp_dir:
-            # Select a .tif data file
-            test_path = test_data.get_path("data-files")
-            cog_path = os.path.join(test_path, [
-                d for d in os.listdir(test_path) if d.lower().endswith(".tif")
-            ][0])
-
             result = self.run_command([
-                "nrcanlandcover", "create-item", "-d", tmp_dir, "-c", cog_path
+                "nrcanlandcover", "create-item", "-d", tmp_dir, "-c",
+                self.cog_path
             ])
             self.assertEqual(result.exit_code,
                              0,
                              msg="\n{}".format(result.output))
 
-            jsons = [p for p in os.listdir(tmp_dir) if p.endswith(".json")]
-            self.assertEqual(len(jsons), 1)
-
-            item_path = os.path.join(tmp_dir, jsons[0])
+            item_path = os.path.join(tmp_dir,
+                                     f"{Path(self.cog_path).stem}.json")
+            self.assertTrue(os.path.exists(item_path))
 
             item = pystac.read_file(item_path)
 
         item.validate()
 
+    def test_create_item_from_directory(self):
+        with TemporaryDirectory() as tmp_dir:
+            test_path = test_data.get_path("data-files")
+            with os.scandir(test_path) as it:
+                tifs = [e.name for e in it if e.name.lower().endswith(".tif")]
+
+            result = self.run_command([
+                "nrcanlandcover", "create-item", "-d", tmp_dir, "-c", test_path
+            ])
+            self.assertEqual(result.exit_code,
+                             0,
+                             msg="\n{}".format(result.output))
+
+            for tif in tifs:
+                self.assertTrue(
+                    os.path.exists(
+                        os.path.join(tmp_dir, f"{Path(tif).stem}.json")))
+
     def test_create_extent_asset(self):
         with TemporaryDirectory() as tmp_dir:
             result = self.run_command(
@@ -90,3 +144,173 @@ class CreateCollectionTest(CliTestCase):
                     extent["features"][0]["geometry"]["coordinates"][0]) == 5
                 assert len(extent["features"][0]["geometry"]["coordinates"][0]
                            [0]) == 2
+
+
+class _RangeHandler(SimpleHTTPRequestHandler):
+    """Serves files with support for single range requests, like the NRCan
+    server, and records the requests it receives."""
+    requests = []
+
+    def send_head(self):
+        self.range_length = None
+        self.requests.append(
+            (self.command, self.path, self.headers.get("Range")))
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)",
+                             self.headers.get("Range", ""))
+        path = self.translate_path(self.path)
+        if match is None or not os.path.isfile(path):
+            return super().send_head()
+
+        size = os.path.getsize(path)
+        start = int(match.group(1))
+        end = min(int(match.group(2) or size - 1), size - 1)
+        f = open(path, "rb")
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if self.command == "HEAD":
+            f.close()
+            return None
+        self.range_length = end - start + 1
+        return f
+
+    def copyfile(self, source, outputfile):
+        if self.range_length is None:
+            return super().copyfile(source, outputfile)
+        outputfile.write(source.read(self.range_length))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StreamCogTest(CliTestCase):
+    def create_subcommand_functions(self):
+        return [create_nrcanlandcover_command]
+
+    def setUp(self):
+        super().setUp()
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.serve_dir = os.path.join(tmp_dir.name, "serve")
+        self.destination = os.path.join(tmp_dir.name, "destination")
+        os.mkdir(self.serve_dir)
+        os.mkdir(self.destination)
+
+        self.source = test_data.get_path("data-files/example2015.tif")
+        shutil.copy(self.source, self.serve_dir)
+        with ZipFile(os.path.join(self.serve_dir, "example2015.zip"), "w",
+                     ZIP_DEFLATED) as zip_ref:
+            zip_ref.writestr("readme.txt", "Land cover")
+            zip_ref.write(self.source, "example2015.tif")
+
+        _RangeHandler.requests = []
+        server = ThreadingHTTPServer(("127.0.0.1", 0),
+                                     partial(_RangeHandler,
+                                             directory=self.serve_dir))
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def write_metadata(self, file_name):
+        return write_metadata(self.serve_dir, f"{self.base_url}/{file_name}")
+
+    def assertStreamed(self, file_name):
+        result = self.run_command([
+            "nrcanlandcover", "create-cog", "-d", self.destination, "-m",
+            self.write_metadata(file_name), "--stream"
+        ])
+        self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+
+        output_path = os.path.join(self.destination, "example2015_cog.tif")
+        with rasterio.open(
+                self.source) as src, rasterio.open(output_path) as dst:
+            self.assertEqual(dst.bounds, src.bounds)
+            self.assertTrue(numpy.array_equal(dst.read(), src.read()))
+        # Only parts of the file were requested, it was never downloaded
+        gets = [(path, byte_range)
+                for method, path, byte_range in _RangeHandler.requests
+                if method == "GET"]
+        self.assertTrue(gets)
+        self.assertTrue(all(byte_range is not None for _, byte_range in gets),
+                        gets)
+
+    def test_create_cog_stream(self):
+        self.assertStreamed("example2015.tif")
+
+    def test_create_cog_stream_zip(self):
+        self.assertStreamed("example2015.zip")
+
+
+class LocalMetadataTest(CliTestCase):
+    def create_subcommand_functions(self):
+        return [create_nrcanlandcover_command]
+
+    def setUp(self):
+        super().setUp()
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.destination = os.path.join(tmp_dir.name, "destination")
+        os.mkdir(self.destination)
+        self.source = test_data.get_path("data-files/example2015.tif")
+        self.metadata = write_metadata(tmp_dir.name, self.source)
+
+        # Nothing may be fetched, the default metadata included
+        session_get = mock.patch.object(utils._session,
+                                        "get",
+                                        side_effect=AssertionError(
+                                            "Unexpected request"))
+        self.session_get = session_get.start()
+        self.addCleanup(session_get.stop)
+
+    def test_group_metadata(self):
+        result = self.run_command([
+            "nrcanlandcover", "-m", self.metadata, "create-extent-asset", "-d",
+            self.destination
+        ])
+        self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+        self.session_get.assert_not_called()
+
+        with open(os.path.join(self.destination, "extent.geojson")) as f:
+            extent = json.load(f)
+        self.assertEqual(extent["features"][0]["geometry"],
+                         json.loads(GEOMETRY))
+
+    def build_full_collection(self):
+        return self.run_command([
+            "nrcanlandcover", "build-full-collection", "-d", self.destination,
+            "-s", self.source, "-m", self.metadata
+        ])
+
+    def test_build_full_collection(self):
+        # A COG already in the destination, not written by the command
+        shutil.copy(self.source,
+                    os.path.join(self.destination, "stray_cog.tif"))
+
+        result = self.build_full_collection()
+        self.assertEqual(result.exit_code, 0, msg="\n{}".format(result.output))
+
+        names = set(os.listdir(self.destination))
+        self.assertEqual({name
+                          for name in names if name.endswith(".json")},
+                         {"collection.json", "example2015_cog.json"})
+        self.assertEqual(
+            {name
+             for name in names if name.endswith("_extent.geojson")},
+            {"example2015_cog_extent.geojson"})
+
+        item = pystac.read_file(
+            os.path.join(self.destination, "example2015_cog.json"))
+        self.assertEqual(item.assets["extent"].href,
+                         "example2015_cog_extent.geojson")
+
+    def test_build_full_collection_item_error(self):
+        with mock.patch.object(commands,
+                               "_create_items",
+                               side_effect=ValueError("Item failed")):
+            result = self.build_full_collection()
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIsInstance(result.exception, ValueError)
@@ -1,150 +1,250 @@
 import os
 import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from tempfile import TemporaryDirectory
 
 import pystac
+from pystac.extensions.label import LabelExtension
+from pystac.extensions.raster import RasterExtension
 
 from stactools.nrcan_landcover import cog, stac, utils
-from stactools.nrcan_landcover.constants import JSONLD_HREF
-from tests import test_data
+from stactools.nrcan_landcover.constants import (
+    FULL_DATASET_BBOX,
+    JSONLD_HREF,
+    LANDCOVER_EPSG,
+    NO_DATA_VALUE,
+)
+from tests import get_test_cog, test_data
+
+ITEM_ASSETS = frozenset({"metadata"})
+ITEM_PROPERTIES = frozenset({
+    # Projection Extension
+    "proj:epsg",
+    "proj:bbox",
+    "proj:transform",
+    "proj:shape",
+    # Label Extension
+    "label:type",
+    "label:tasks",
+    "label:properties",
+    "label:description",
+    "label:classes",
+    # Scientific Extension
+    "sci:doi",
+    "sci:citation",
+})
+ITEM_ASSET_FIELDS = frozenset({
+    # Projection Extension
+    "proj:epsg",
+    "proj:bbox",
+    "proj:transform",
+    "proj:shape",
+    # File Extension
+    "file:size",
+    "file:values",
+    # Raster Extension
+    "raster:bands",
+})
+ITEM_ASSET_ROLES = frozenset({"data", "labels", "labels-raster"})
+RASTER_BAND_FIELDS = frozenset(
+    {"nodata", "sampling", "data_type", "spatial_resolution"})
+COLLECTION_ASSETS = frozenset({"metadata", "thumbnail"})
+COLLECTION_FIELDS = frozenset({"sci:doi", "sci:citation"})
+COLLECTION_SUMMARIES = frozenset(
+    {"proj:epsg", "label:type", "label:tasks", "label:classes"})
+COLLECTION_ITEM_ASSET_FIELDS = frozenset(
+    {"proj:epsg", "file:values", "raster:bands"})
 
 
 class StacTest(unittest.TestCase):
-    def test_create_cog(self):
-        with TemporaryDirectory() as tmp_dir:
-            test_path = test_data.get_path("data-files")
-            paths = [
-                os.path.join(test_path, d) for d in os.listdir(test_path)
-                if d.lower().endswith(".tif")
-            ]
+    @classmethod
+    def setUpClass(cls):
+        cls.metadata = utils.get_metadata(JSONLD_HREF)
 
-            for path in paths:
-                output_path = os.path.join(
-                    tmp_dir,
-                    os.path.basename(path)[:-4] + "_cog.tif")
-                cog.create_cog(path, output_path)
+        cls.cog_path = get_test_cog()
+        cls._tmp = TemporaryDirectory()
 
-                cogs = [
-                    p for p in os.listdir(tmp_dir) if p.endswith("_cog.tif")
-                ]
-                self.assertEqual(len(cogs), 1)
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
 
-    def test_create_item(self):
-        with TemporaryDirectory() as tmp_dir:
-            metadata = utils.get_metadata(JSONLD_HREF)
+    def assertContainsAll(self, expected, actual):
+        missing = expected.difference(actual)
+        self.assertFalse(missing, msg=f"Missing: {sorted(missing)}")
 
-            # Select a .tif data file
+    def test_create_cog(self):
+        with TemporaryDirectory() as tmp_dir:
             test_path = test_data.get_path("data-files")
-            cog_path = os.path.join(test_path, [
-                d for d in os.listdir(test_path) if d.lower().endswith(".tif")
-            ][0])
+            with os.scandir(test_path) as it:
+                paths = [e.path for e in it if e.name.lower().endswith(".tif")]
 
-            # Create stac item
-            json_path = os.path.join(tmp_dir, "test.json")
-            item = stac.create_item(metadata, tmp_dir, JSONLD_HREF, cog_path)
-            item.set_self_href(json_path)
-            item.save_object(dest_href=json_path)
+            output_paths = [
+                os.path.join(tmp_dir, f"{Path(path).stem}_cog.tif")
+                for path in paths
+            ]
 
-            jsons = [p for p in os.listdir(tmp_dir) if p.endswith(".json")]
-            self.assertEqual(len(jsons), 1)
+            # The COGs are independent of each other, create them in parallel
+            with ProcessPoolExecutor() as ex:
+                produced = set(ex.map(cog.create_cog, paths, output_paths))
 
-            item_path = os.path.join(tmp_dir, jsons[0])
+            self.assertEqual(produced, set(output_paths))
+            for output_path in output_paths:
+                self.assertTrue(os.path.exists(output_path))
 
-            item = pystac.read_file(item_path)
+    def test_create_item(self):
+        # Create stac item
+        item = stac.create_item(self.metadata, self._tmp.name, JSONLD_HREF,
+                                self.cog_path)
         asset = item.assets["landcover"]
 
-        assert "metadata" in item.assets
-        assert "data" in asset.roles
+        self.assertContainsAll(ITEM_ASSETS, item.assets)
+        self.assertContainsAll(ITEM_PROPERTIES, item.properties)
+        self.assertContainsAll(ITEM_ASSET_FIELDS, asset.extra_fields)
+        self.assertContainsAll(ITEM_ASSET_ROLES, asset.roles)
 
-        # Projection Extension
-        assert "proj:epsg" in item.properties
-        assert "proj:bbox" in item.properties
-        assert "proj:transform" in item.properties
-        assert "proj:shape" in item.properties
-
-        assert "proj:epsg" in asset.extra_fields
-        assert "proj:bbox" in asset.extra_fields
-        assert "proj:transform" in asset.extra_fields
-        assert "proj:shape" in asset.extra_fields
-
-        # File Extension
-        assert "file:size" in asset.extra_fields
-        assert "file:values" in asset.extra_fields
         assert len(asset.extra_fields["file:values"]) > 0
-
-        # Raster Extension
-        assert "raster:bands" in asset.extra_fields
         assert len(asset.extra_fields["raster:bands"]) == 1
-        assert "nodata" in asset.extra_fields["raster:bands"][0]
-        assert "sampling" in asset.extra_fields["raster:bands"][0]
-        assert "data_type" in asset.extra_fields["raster:bands"][0]
-        assert "spatial_resolution" in asset.extra_fields["raster:bands"][0]
-
-        # Label Extension
-        assert "labels" in asset.roles
-        assert "labels-raster" in asset.roles
+        self.assertContainsAll(RASTER_BAND_FIELDS,
+                               asset.extra_fields["raster:bands"][0])
 
-        assert "label:type" in item.properties
-        assert "label:tasks" in item.properties
-        assert "label:properties" in item.properties
-        assert "label:description" in item.properties
-        assert "label:classes" in item.properties
-
-        # Scientific Extension
-        assert "sci:doi" in item.properties
-        assert "sci:citation" in item.properties
+        with self.subTest("roundtrip"):
+            json_path = os.path.join(self._tmp.name, "item.json")
+            item.set_self_href(json_path)
+            item.save_object(dest_href=json_path)
 
-        item.validate()
+            pystac.read_file(json_path).validate()
+
+    def test_include_wkt2(self):
+        item = stac.create_item(self.metadata, self._tmp.name, JSONLD_HREF,
+                                self.cog_path)
+        self.assertIn("proj:wkt2", item.properties)
+        self.assertIn("proj:wkt2", item.assets["landcover"].extra_fields)
+
+        item = stac.create_item(self.metadata,
+                                self._tmp.name,
+                                JSONLD_HREF,
+                                self.cog_path,
+                                include_wkt2=False)
+        self.assertNotIn("proj:wkt2", item.properties)
+        self.assertNotIn("proj:wkt2", item.assets["landcover"].extra_fields)
+        self.assertEqual(item.properties["proj:epsg"], LANDCOVER_EPSG)
+
+    def test_fetch_size(self):
+        item = stac.create_item(self.metadata, self._tmp.name, JSONLD_HREF,
+                                self.cog_path)
+        self.assertEqual(item.assets["landcover"].extra_fields["file:size"],
+                         os.path.getsize(self.cog_path))
+
+        item = stac.create_item(self.metadata,
+                                self._tmp.name,
+                                JSONLD_HREF,
+                                self.cog_path,
+                                fetch_size=False)
+        self.assertNotIn("file:size", item.assets["landcover"].extra_fields)
+
+    def test_bbox_equal(self):
+        bbox = list(FULL_DATASET_BBOX)
+        self.assertTrue(stac._bbox_equal(bbox, FULL_DATASET_BBOX))
+        self.assertTrue(
+            stac._bbox_equal([bbox[0] + 5e-7] + bbox[1:], FULL_DATASET_BBOX))
+        self.assertFalse(
+            stac._bbox_equal([bbox[0] + 2e-6] + bbox[1:], FULL_DATASET_BBOX))
+        self.assertFalse(stac._bbox_equal(bbox[:3], FULL_DATASET_BBOX))
+
+    def test_get_cog_geom_tiled(self):
+        cog_geom = stac.get_cog_geom(self.cog_path, self.metadata)
+
+        self.assertTrue(cog_geom["tiled"])
+        self.assertFalse(
+            stac._bbox_equal(cog_geom["cog_bbox"], FULL_DATASET_BBOX))
+        min_x, min_y, max_x, max_y = cog_geom["bbox"]
+        self.assertEqual(cog_geom["geometry"]["type"], "Polygon")
+        self.assertCountEqual(
+            cog_geom["geometry"]["coordinates"][0][:4],
+            [[min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y]])
+
+    def test_created_objects_are_independent(self):
+        # Changing one Item must not change later Items or the Collection
+        item = stac.create_item(self.metadata, self._tmp.name, JSONLD_HREF,
+                                self.cog_path)
+        RasterExtension.ext(item.assets["landcover"]).bands[0].nodata = 255
+        item.assets["landcover"].extra_fields["file:values"][0]["summary"] = ""
+        LabelExtension.ext(item).label_tasks.append("segmentation")
+        full_item = stac.create_item(self.metadata, self._tmp.name,
+                                     JSONLD_HREF)
+        full_item.geometry["coordinates"][0][0] = [0.0, 0.0]
+
+        item = stac.create_item(self.metadata, self._tmp.name, JSONLD_HREF,
+                                self.cog_path)
+        full_item = stac.create_item(self.metadata, self._tmp.name,
+                                     JSONLD_HREF)
+        collection = stac.create_collection(self.metadata, JSONLD_HREF)
+        item_asset = collection.extra_fields["item_assets"]["landcover"]
+
+        self.assertEqual(
+            RasterExtension.ext(item.assets["landcover"]).bands[0].nodata,
+            NO_DATA_VALUE)
+        self.assertEqual(item_asset["raster:bands"][0]["nodata"],
+                         NO_DATA_VALUE)
+        self.assertNotEqual(
+            item.assets["landcover"].extra_fields["file:values"][0]["summary"],
+            "")
+        self.assertNotEqual(item_asset["file:values"][0]["summary"], "")
+        self.assertNotIn("segmentation", LabelExtension.ext(item).label_tasks)
+        self.assertNotEqual(full_item.geometry["coordinates"][0][0],
+                            [0.0, 0.0])
+        self.assertEqual(full_item.geometry,
+                         utils.get_metadata(JSONLD_HREF)["geom_metadata"])
+
+    def test_create_items(self):
+        # Use every .tif data file, twice
+        test_path = test_data.get_path("data-files")
+        with os.scandir(test_path) as it:
+            cog_paths = [
+                e.path for e in it if e.name.lower().endswith(".tif")
+            ] * 2
+
+        items = stac.create_items(self.metadata, test_path, cog_paths,
+                                  JSONLD_HREF)
+        self.assertEqual(len(items), len(cog_paths))
+        for cog_path, item in zip(cog_paths, items):
+            self.assertEqual(
+                item.to_dict(),
+                stac.create_item(self.metadata, test_path, JSONLD_HREF,
+                                 cog_path).to_dict())
+
+        extent_paths = [
+            os.path.join(test_path, f"extent_{i}.geojson")
+            for i in range(len(cog_paths))
+        ]
+        items = stac.create_items(self.metadata,
+                                  test_path,
+                                  cog_paths,
+                                  JSONLD_HREF,
+                                  extent_asset_hrefs=extent_paths)
+        self.assertEqual([item.assets["extent"].href for item in items],
+                         [os.path.basename(path) for path in extent_paths])
 
     def test_create_collection(self):
-        with TemporaryDirectory() as tmp_dir:
-            metadata = utils.get_metadata(JSONLD_HREF)
-
-            # Create stac collection
-            json_path = os.path.join(tmp_dir, "test.json")
-            collection = stac.create_collection(metadata, JSONLD_HREF)
+        # Create stac collection
+        collection = stac.create_collection(self.metadata, JSONLD_HREF)
+        item_asset = collection.extra_fields["item_assets"]["landcover"]
+        summaries = collection.summaries.to_dict()
+
+        self.assertContainsAll(COLLECTION_ASSETS, collection.assets)
+        self.assertContainsAll(COLLECTION_FIELDS, collection.extra_fields)
+        self.assertContainsAll(COLLECTION_SUMMARIES, summaries)
+        self.assertContainsAll(ITEM_ASSET_ROLES, item_asset["roles"])
+        self.assertContainsAll(COLLECTION_ITEM_ASSET_FIELDS, item_asset)
+
+        assert len(item_asset["file:values"]) > 0
+        self.assertContainsAll(RASTER_BAND_FIELDS,
+                               item_asset["raster:bands"][0])
+
+        with self.subTest("roundtrip"):
+            json_path = os.path.join(self._tmp.name, "collection.json")
             collection.set_self_href(json_path)
             collection.save_object(dest_href=json_path)
 
-            jsons = [p for p in os.listdir(tmp_dir) if p.endswith(".json")]
-            self.assertEqual(len(jsons), 1)
-
-            collection_path = os.path.join(tmp_dir, jsons[0])
-
-            collection = pystac.read_file(collection_path)
-
-            item_asset = collection.extra_fields["item_assets"]["landcover"]
-            summaries = collection.summaries.to_dict()
-
-            assert "metadata" in collection.assets
-            assert "thumbnail" in collection.assets
-            assert "data" in item_asset["roles"]
-
-            # Projection Extension
-            assert "proj:epsg" in item_asset
-            assert "proj:epsg" in summaries
-
-            # File Extension
-            assert "file:values" in item_asset
-            assert len(item_asset["file:values"]) > 0
-
-            # Raster Extension
-            assert "raster:bands" in item_asset
-            assert "nodata" in item_asset["raster:bands"][0]
-            assert "sampling" in item_asset["raster:bands"][0]
-            assert "data_type" in item_asset["raster:bands"][0]
-            assert "spatial_resolution" in item_asset["raster:bands"][0]
-
-            # Label Extension
-            assert "labels" in item_asset["roles"]
-            assert "labels-raster" in item_asset["roles"]
-
-            assert "label:type" in summaries
-            assert "label:tasks" in summaries
-            assert "label:classes" in summaries
-
-            # Scientific Extension
-            assert "sci:doi" in collection.extra_fields
-            assert "sci:citation" in collection.extra_fields
-
-            collection.validate()
+            pystac.read_file(json_path).validate()
@@ -0,0 +1,139 @@
+import os
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import mock
+
+from stactools.nrcan_landcover import utils
+from stactools.nrcan_landcover.constants import METADATA_CACHE_TTL
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves `body`, with `etag` as its ETag if set, and records the
+    requests it receives."""
+    body = b'{"a": 1}'
+    etag = None
+    head_status = 200
+    requests = []
+
+    def _send_headers(self, status):
+        self.send_response(status)
+        if self.etag is not None:
+            self.send_header("ETag", self.etag)
+        self.send_header("Content-Length",
+                         str(len(self.body) if status == 200 else 0))
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.requests.append(("HEAD", self.path))
+        self._send_headers(self.head_status)
+
+    def do_GET(self):
+        self.requests.append(("GET", self.path))
+        if (self.etag is not None
+                and self.headers.get("If-None-Match") == self.etag):
+            self._send_headers(304)
+        else:
+            self._send_headers(200)
+            self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _Handler.body = b'{"a": 1}'
+        _Handler.etag = None
+        _Handler.head_status = 200
+        _Handler.requests = []
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": tmp_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expire(self, url):
+        cache_path = os.path.join(utils.get_cache_dir(),
+                                  utils._cache_key(url) + ".json")
+        old = time.time() - METADATA_CACHE_TTL - 1
+        os.utime(cache_path, (old, old))
+        return cache_path
+
+    def test_download_cached_reuses_unchanged_file(self):
+        _Handler.etag = '"v1"'
+        url = f"{self.base_url}/file.tif"
+        first = utils.download_cached(url)
+        second = utils.download_cached(url)
+
+        self.assertEqual(first, second)
+        with open(second, "rb") as f:
+            self.assertEqual(f.read(), _Handler.body)
+        self.assertEqual(_Handler.requests, [("HEAD", "/file.tif"),
+                                             ("GET", "/file.tif"),
+                                             ("HEAD", "/file.tif")])
+
+    def test_download_cached_without_validator(self):
+        url = f"{self.base_url}/file.tif"
+        utils.download_cached(url)
+        _Handler.body = b'{"a": 2}'
+        path = utils.download_cached(url)
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b'{"a": 2}')
+        self.assertEqual([method
+                          for method, _ in _Handler.requests].count("GET"), 2)
+
+    def test_download_cached_head_not_allowed(self):
+        _Handler.head_status = 405
+        path = utils.download_cached(f"{self.base_url}/file.tif")
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), _Handler.body)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["file.tif"])
+
+    def test_get_cached_json_fresh(self):
+        url = f"{self.base_url}/m.jsonld"
+        self.assertEqual(utils._get_cached_json(url), {"a": 1})
+        self.assertEqual(utils._get_cached_json(url), {"a": 1})
+
+        self.assertEqual(_Handler.requests, [("GET", "/m.jsonld")])
+
+    def test_get_cached_json_not_modified(self):
+        _Handler.etag = '"v1"'
+        url = f"{self.base_url}/m.jsonld"
+        utils._get_cached_json(url)
+        cache_path = self.expire(url)
+        _Handler.body = b'{"a": 2}'
+
+        self.assertEqual(utils._get_cached_json(url), {"a": 1})
+        self.assertEqual(len(_Handler.requests), 2)
+        # Fresh again, so no further request is made
+        self.assertLess(time.time() - os.path.getmtime(cache_path),
+                        METADATA_CACHE_TTL)
+        self.assertEqual(utils._get_cached_json(url), {"a": 1})
+        self.assertEqual(len(_Handler.requests), 2)
+
+    def test_get_cached_json_without_validator(self):
+        url = f"{self.base_url}/m.jsonld"
+        utils._get_cached_json(url)
+        self.expire(url)
+        _Handler.body = b'{"a": 2}'
+
+        self.assertEqual(utils._get_cached_json(url), {"a": 2})
+        self.assertEqual(len(_Handler.requests), 2)
+        self.assertEqual(utils._get_cached_json(url), {"a": 2})
+        self.assertEqual(len(_Handler.requests), 2)